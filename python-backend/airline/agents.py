@@ -1,26 +1,29 @@
 from __future__ import annotations as _annotations
 
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from collections import OrderedDict
+from collections.abc import Mapping
+from functools import cache, lru_cache
 from pathlib import Path
+from types import MappingProxyType
 
-from dotenv import load_dotenv
-from agents import Agent, RunContextWrapper, handoff
+from agents import Agent, FileSearchTool, ModelSettings, RunContextWrapper, handoff
 from agents.extensions.handoff_prompt import RECOMMENDED_PROMPT_PREFIX
+from lucentive.tools import (
+    country_offers_for,
+    get_broker_assets,
+    get_broker_assets_batch,
+    get_country_offers,
+    normalize_country,
+)
 
-# Load environment variables
-load_dotenv()
-
-# Try importing FileSearchTool - adjust import path if needed
-try:
-    from agents.tools import FileSearchTool
-except ImportError:
-    try:
-        from agents import FileSearchTool
-    except ImportError:
-        # Fallback: will use string-based tool configuration if needed
-        FileSearchTool = None
-
-from .context import AirlineAgentChatContext
-from .context_cache import restore_lead_info_to_context, restore_onboarding_state_to_context
+from .context import AirlineAgentChatContext, OnboardingSnapshot
+from .context_cache import restore_thread_context
 from .guardrails import jailbreak_guardrail, relevance_guardrail
 from .tools import (
     get_scheduling_context,
@@ -28,169 +31,275 @@ from .tools import (
     update_onboarding_state,
 )
 
-# Import the new broker assets tool from lucentive module
-try:
-    from lucentive.tools import get_broker_assets, get_country_offers
-except ImportError:
-    # Fallback if lucentive module not available
-    get_broker_assets = None
-    get_country_offers = None
+logger = logging.getLogger(__name__)
 
-MODEL = "gpt-5.2"
+# Every agent prompt starts with exactly these bytes (SDK handoff preamble + one newline), so the
+# shared part of all four prompts is byte-identical for provider-side prefix caching.
+_PROMPT_PREAMBLE = sys.intern(f"{RECOMMENDED_PROMPT_PREFIX}\n")
 
+MODEL = "gpt-5.2"
+# The scheduling agent only calls get_scheduling_context and relays its message, so it runs on
+# a smaller, faster model. Onboarding and FAQ keep MODEL.
+SCHEDULING_MODEL = "gpt-5-mini"
+# Triage mostly picks one of three handoffs; the intent classifier already skips it for the clear cases.
+TRIAGE_MODEL = os.environ.get("TRIAGE_MODEL", "gpt-5-mini")
+# Extended prompt caching keeps the static prefixes warm between sparse conversations instead of
+# the default few minutes in memory. Only requested for models that offer it.
+PROMPT_CACHE_RETENTION = "24h"
+_EXTENDED_PROMPT_CACHE_MODELS = frozenset({"gpt-5.2", "gpt-5.1", "gpt-5", "gpt-4.1"})
+
+
+def _state_block(state: dict) -> str:
+    """Render per-turn state as a trailing JSON block with a deterministic key order."""
+    return "STATE:\n" + json.dumps(state, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _prompt_cache_settings(agent_key: str, static_prefix: str, model: str, **settings) -> ModelSettings:
+    """Pin an agent's requests to one OpenAI prompt-cache bucket shared by all threads.
+
+    Without an explicit key the SDK generates a fresh one per run, so every turn would start a new
+    bucket. The key includes a hash of the static prefix, so editing a prompt moves to a new bucket.
+    Cached prefixes are retained for PROMPT_CACHE_RETENTION when `model` supports it.
+    Extra keyword arguments are passed through to ModelSettings.
+    """
+    digest = hashlib.sha256(static_prefix.encode("utf-8")).hexdigest()[:12]
+    if model in _EXTENDED_PROMPT_CACHE_MODELS:
+        settings.setdefault("prompt_cache_retention", PROMPT_CACHE_RETENTION)
+    return ModelSettings(extra_args={"prompt_cache_key": f"lucentive-{agent_key}-{digest}"}, **settings)
+
+
+# Investments FAQ knowledge base. One tool instance, built at import and shared by every run.
+FAQ_VECTOR_STORE_ID = "vs_6943a96a15188191926339603da7e399"
+_FILE_SEARCH_TOOL = FileSearchTool(vector_store_ids=[FAQ_VECTOR_STORE_ID])
+
+# Every agent screens input with the same two guardrails (which share one screening call).
+# The SDK requires a list and only reads it (it concatenates, never mutates), so one is shared.
+_INPUT_GUARDRAILS = [relevance_guardrail, jailbreak_guardrail]
+
+# Static FAQ prompt (no per-turn values); its hash keys the FAQ agent's prompt-cache bucket.
+_FAQ_INSTRUCTIONS = sys.intern(
+    f"{_PROMPT_PREAMBLE}"
+    "You are the Investments FAQ Agent. You specialize in answering questions about investments, trading bots, stocks, and related financial topics.\n"
+    "If you are speaking to a customer, you were likely transferred from the triage agent.\n"
+    "\n"
+    "CRITICAL: Only answer when the customer has asked a SPECIFIC QUESTION. Do NOT provide information upfront or give unsolicited answers. "
+    "If no question has been asked, politely ask what they'd like to know or return to the Triage Agent.\n"
+    "\n"
+    "Important: You should respond as a knowledgeable human expert, not as an AI agent. "
+    "Answer questions naturally and confidently as if you personally know the information.\n"
+    "\n"
+    "Use the following routine to support the customer:\n"
+    "1. First, check if the customer has asked a specific question. If not, ask what they'd like to know or return to Triage Agent.\n"
+    "2. If a question was asked, identify the specific question about investments, trading bots, or related topics.\n"
+    "3. Use the file_search tool to find the relevant information (use it silently in the background - do not mention it to the customer).\n"
+    "4. Respond to the customer naturally and conversationally with the answer. Answer as if you know this information personally - "
+    "do not mention sources, knowledge bases, or that you \"looked up\" anything. Never say phrases like \"the info provided says\", "
+    "\"according to the knowledge base\", or \"based on the documentation\".\n"
+    "5. If you cannot find relevant information, politely inform the customer that you don't have that information available right now, "
+    "then hand off to the Triage Agent. This ensures that the next time around, the conversation will go back and start with the "
+    "Triage Agent for proper follow-up handling.\n"
+    "6. When done, return to the Triage Agent."
+)
 
 investments_faq_agent = Agent[AirlineAgentChatContext](
     name="Investments FAQ Agent",
     model=MODEL,
     handoff_description="Answers investment-related questions about trading bots, stocks, investments, and related topics.",
-    instructions=f"""{RECOMMENDED_PROMPT_PREFIX}
-    You are the Investments FAQ Agent. You specialize in answering questions about investments, trading bots, stocks, and related financial topics.
-    If you are speaking to a customer, you were likely transferred from the triage agent.
-    
-    CRITICAL: Only answer when the customer has asked a SPECIFIC QUESTION. Do NOT provide information upfront or give unsolicited answers. If no question has been asked, politely ask what they'd like to know or return to the Triage Agent.
-    
-    Important: You should respond as a knowledgeable human expert, not as an AI agent. Answer questions naturally and confidently as if you personally know the information.
-    
-    Use the following routine to support the customer:
-    1. First, check if the customer has asked a specific question. If not, ask what they'd like to know or return to Triage Agent.
-    2. If a question was asked, identify the specific question about investments, trading bots, or related topics.
-    3. Use the file_search tool to find the relevant information (use it silently in the background - do not mention it to the customer).
-    4. Respond to the customer naturally and conversationally with the answer. Answer as if you know this information personally - do not mention sources, knowledge bases, or that you "looked up" anything. Never say phrases like "the info provided says", "according to the knowledge base", or "based on the documentation".
-    5. If you cannot find relevant information, politely inform the customer that you don't have that information available right now, then hand off to the Triage Agent. This ensures that the next time around, the conversation will go back and start with the Triage Agent for proper follow-up handling.
-    6. When done, return to the Triage Agent.""",
-    tools=[FileSearchTool(vector_store_ids=["vs_6943a96a15188191926339603da7e399"])] if FileSearchTool else ["file_search"],
-    input_guardrails=[relevance_guardrail, jailbreak_guardrail],
+    instructions=_FAQ_INSTRUCTIONS,
+    model_settings=_prompt_cache_settings("faq", _FAQ_INSTRUCTIONS, MODEL),
+    tools=[_FILE_SEARCH_TOOL],
+    input_guardrails=_INPUT_GUARDRAILS,
 )
 
 
-def _load_scheduling_skill() -> str:
-    skill_path = Path(__file__).parent / "skills" / "scheduling" / "SKILL.md"
-    try:
-        return skill_path.read_text(encoding="utf-8")
-    except OSError:
-        return ""
+_SKILLS_DIR = Path(__file__).parent / "skills"
+# Skill metadata (YAML front matter), horizontal rules, trailing spaces and extra blank lines
+# carry no instructions; they are dropped before the skill goes into a prompt.
+_FRONT_MATTER_RE = re.compile(r"\A---\n.*?\n---\n+", re.DOTALL)
+_RULE_LINE_RE = re.compile(r"^-{3,}$\n?", re.MULTILINE)
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+$", re.MULTILINE)
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
 
+def _compact_skill(text: str) -> str:
+    text = _FRONT_MATTER_RE.sub("", text)
+    text = _TRAILING_SPACE_RE.sub("", text)
+    text = _RULE_LINE_RE.sub("", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
 
-def _load_onboarding_skill() -> str:
-    skill_path = Path(__file__).parent / "skills" / "onboarding" / "SKILL.md"
+
+@cache
+def _load_skill(name: str) -> str:
+    """Prompt-ready contents of skills/<name>/SKILL.md, read once per process; empty if missing."""
     try:
-        return skill_path.read_text(encoding="utf-8")
+        return _compact_skill((_SKILLS_DIR / name / "SKILL.md").read_text(encoding="utf-8"))
     except OSError:
         return ""
 
 
-def scheduling_instructions(
-    run_context: RunContextWrapper[AirlineAgentChatContext], agent: Agent[AirlineAgentChatContext]
-) -> str:
-    skill_content = _load_scheduling_skill()
-    return (
-        f"{RECOMMENDED_PROMPT_PREFIX}\n"
-        "FIRST RULE: When the user says yes/sure/ok/yes please to a callback, reply with ONLY: \"That's great, someone will give you a call in the next [timeframe].\" Do not ask for phone, timezone, or country code. Never.\n"
-        "\n"
-        "You are the Scheduling Agent. The user has asked to be called back and was handed off from Triage.\n"
-        "\n"
-        "CRITICAL: When the user ACCEPTS a callback (e.g. \"yes\", \"sure\", \"ok\", \"yes please\"), reply with ONLY a "
-        "short confirmation of the timeframe (e.g. \"That's great, someone will give you a call in the next 2–4 hours.\") "
-        "and hand off to Triage. NEVER ask for phone number, timezone, or country code—we already have them from the campaign. "
-        "Do NOT say \"confirm the best phone number\", \"phone number (with country code)\", \"your time zone\", or \"so we can place the callback\".\n"
-        "\n"
-        "You have access to the **scheduling skill** below. Follow it. Your only tool is **get_scheduling_context**. "
-        "Call it first. It returns **context only** (day, open/closed, why, available offers, reasons). "
-        "**Do not** copy-paste any message from the tool. Use the context to reply in **natural language** and explain "
-        "why you're offering what you're offering.\n"
-        "\n"
-        "Offer one option at a time; if the user declines, call the tool again with exclude_actions and offer the next "
-        "option. When the user accepts: one confirmation sentence only, then hand off. Do not ask for phone or timezone.\n"
-        "\n"
-        "---\n"
-        "## Scheduling skill\n"
-        "\n"
-        f"{skill_content}"
-    )
+# Built once at import and passed to the agent as a plain string: the scheduling prompt has no
+# per-turn values.
+_SCHEDULING_INSTRUCTIONS = sys.intern(
+    f"{_PROMPT_PREAMBLE}"
+    "You are the Scheduling Agent. The user has asked to be called back and was handed off from Triage.\n"
+    "\n"
+    "FIRST RULE: When the user ACCEPTS a callback (e.g. \"yes\", \"sure\", \"ok\", \"yes please\"), reply with ONLY: "
+    "\"That's great, someone will give you a call in the next [timeframe].\" and hand off to Triage. "
+    "NEVER ask for phone number, timezone, or country code—we already have them from the campaign (skill rule R1).\n"
+    "\n"
+    "Follow the **scheduling skill** below. Your only tool is **get_scheduling_context**.\n"
+    "\n"
+    "---\n"
+    "## Scheduling skill\n"
+    "\n"
+    f"{_load_skill('scheduling')}"
+)
 
 
 scheduling_agent = Agent[AirlineAgentChatContext](
     name="Scheduling Agent",
-    model=MODEL,
+    model=SCHEDULING_MODEL,
     handoff_description="Handles call scheduling requests and suggests available call times.",
-    instructions=scheduling_instructions,
+    instructions=_SCHEDULING_INSTRUCTIONS,
+    model_settings=_prompt_cache_settings("scheduling", _SCHEDULING_INSTRUCTIONS, SCHEDULING_MODEL),
     tools=[get_scheduling_context],
-    input_guardrails=[relevance_guardrail, jailbreak_guardrail],
+    input_guardrails=_INPUT_GUARDRAILS,
+)
+
+
+_PHASE_4_HEADING = "## Phase 4 — Execution"
+_RULES_HEADING = "## Rules"
+
+
+def _split_onboarding_skill(skill: str) -> tuple[str, str]:
+    """Split the onboarding skill into (everything but Phase 4, the Phase 4 section).
+
+    Phase 4 (broker links, videos, copy-trading steps) is the largest section and only matters once
+    the lead reaches it, so it is sent only from then on. Returns (skill, "") if the headings move.
+    """
+    start = skill.find(_PHASE_4_HEADING)
+    end = skill.find(_RULES_HEADING, start)
+    if start == -1 or end == -1:
+        return skill, ""
+    return skill[:start] + skill[end:], skill[start:end].rstrip().removesuffix("---").rstrip()
+
+
+_ONBOARDING_SKILL_CORE, _ONBOARDING_SKILL_EXECUTION = _split_onboarding_skill(_load_skill("onboarding"))
+
+# Static part of the onboarding prompt, built once at import. Per-turn state is appended
+# after it so the prefix stays byte-identical across turns (provider-side prompt caching).
+_ONBOARDING_STATIC_PREFIX = sys.intern(
+    f"{_PROMPT_PREAMBLE}"
+    "You are the Onboarding Agent. Your role is to guide new leads through the onboarding process step by step.\n"
+    "\n"
+    "Lead information (first_name, country) is ALREADY PROVIDED in the STATE block at the end of these instructions - DO NOT ASK FOR IT.\n"
+    "CRITICAL: The lead's country is already known (see STATE). DO NOT ask the user for their country. "
+    "Use the STATE country when calling get_country_offers(country). If country shows \"Unknown\", you may ask for it; otherwise use the provided value.\n"
+    "\n"
+    "The current onboarding state (completed steps, collected answers and the current step to work on) is also in the STATE block.\n"
+    "When STATE has a `plan.offers` entry, it is the get_country_offers result for this lead's country: use it directly instead of calling get_country_offers.\n"
+    "\n"
+    "You have access to the **onboarding skill** below. Follow it. Use the tools (get_country_offers, get_broker_assets, get_broker_assets_batch, update_onboarding_state, update_lead_info) as the skill describes. "
+    "Do not copy-paste raw JSON to the user; use tool output to reply in natural language.\n"
+    "The skill's Phase 4 (execution: broker links, videos, copy-trading steps) is appended after it once the lead reaches that phase.\n"
+    "\n"
+    "---\n"
+    "## Onboarding skill\n"
+    "\n"
+    f"{_ONBOARDING_SKILL_CORE}\n"
+    "\n"
+    "---\n"
+)
+# Steps at or after Phase 4. Their prompt extends the static prefix above, so both variants share
+# the same cached prefix.
+_EXECUTION_STEPS = frozenset({"has_broker_account", "instructions", "complete"})
+_ONBOARDING_EXECUTION_PREFIX = sys.intern(
+    _ONBOARDING_STATIC_PREFIX
+    + (f"## Onboarding skill (continued)\n\n{_ONBOARDING_SKILL_EXECUTION}\n\n---\n" if _ONBOARDING_SKILL_EXECUTION else "")
 )
 
 
+# Onboarding steps in flow order; completed_steps is rendered in this order so the STATE block
+# does not depend on the order in which the steps happened to be recorded.
+_STEP_ORDER = (
+    "trading_experience",
+    "bot_recommendation",
+    "broker_selection",
+    "budget_check",
+    "profit_share_clarification",
+    "has_broker_account",
+    "instructions",
+)
+_STEP_RANK = {step: rank for rank, step in enumerate(_STEP_ORDER)}
+
+
+def _canonical_steps(steps) -> list[str]:
+    """De-duplicate completed steps and sort them in flow order (unknown steps last, alphabetically)."""
+    return sorted(set(steps), key=lambda step: (_STEP_RANK.get(step, len(_STEP_RANK)), step))
+
+
+# Steps whose next message depends only on the country's offers (bots or brokers).
+_OFFER_FIELDS_BY_STEP = {
+    "bot_recommendation": ("bots",),
+    "broker_selection": ("brokers", "notes"),
+}
+
+
+@lru_cache(maxsize=64)
+def _onboarding_plan(current_step: str, country_group: str | None) -> dict:
+    """Deterministic plan for a (step, country group) pair, computed once and reused across leads.
+
+    Pre-resolves the country offers for the bot/broker steps so the model can answer without a
+    get_country_offers round trip. The returned dict is shared; callers must not mutate it.
+    """
+    plan: dict = {"next_step": current_step}
+    fields = _OFFER_FIELDS_BY_STEP.get(current_step)
+    if fields and country_group:
+        offers = country_offers_for(country_group)
+        if offers is not None:
+            plan["offers"] = {field: offers[field] for field in fields}
+    return plan
+
+
+@lru_cache(maxsize=512)
+def _render_onboarding_instructions(first_name: str, country: str, snapshot: OnboardingSnapshot) -> str:
+    """Full onboarding prompt for one lead/state combination; repeat turns reuse the string."""
+    completed_steps = _canonical_steps(snapshot.completed_steps)
+    done = frozenset(completed_steps)
+    # has_broker_account only applies once a broker has been chosen.
+    current_step = next(
+        (
+            step
+            for step in _STEP_ORDER
+            if step not in done and (step != "has_broker_account" or snapshot.broker_preference)
+        ),
+        "complete",
+    )
+
+    state = {
+        "first_name": first_name,
+        "country": country,
+        "completed_steps": completed_steps,
+        **snapshot.answers(),
+        "onboarding_complete": snapshot.onboarding_complete,
+        "current_step": current_step,
+    }
+    # An unknown country must be asked for, so no offers are pre-resolved for it.
+    country_group = normalize_country(country) if country != "Unknown" else None
+    state["plan"] = _onboarding_plan(current_step, country_group)
+
+    prefix = _ONBOARDING_EXECUTION_PREFIX if current_step in _EXECUTION_STEPS else _ONBOARDING_STATIC_PREFIX
+    return prefix + _state_block(state)
+
+
 def onboarding_instructions(
     run_context: RunContextWrapper[AirlineAgentChatContext], agent: Agent[AirlineAgentChatContext]
 ) -> str:
     ctx = run_context.context.state
-    country = ctx.country or "Unknown"
-    first_name = ctx.first_name or "there"
-
-    onboarding_state = ctx.onboarding_state or {}
-    completed_steps = onboarding_state.get("completed_steps", [])
-    trading_experience = onboarding_state.get("trading_experience")
-    previous_broker = onboarding_state.get("previous_broker")
-    trading_type = onboarding_state.get("trading_type")
-    bot_preference = onboarding_state.get("bot_preference")
-    broker_preference = onboarding_state.get("broker_preference")
-    budget_confirmed = onboarding_state.get("budget_confirmed")
-    budget_amount = onboarding_state.get("budget_amount")
-    demo_offered = onboarding_state.get("demo_offered")
-    instructions_provided = onboarding_state.get("instructions_provided")
-    onboarding_complete = onboarding_state.get("onboarding_complete", False)
-    has_broker_account = onboarding_state.get("has_broker_account")
-
-    if "trading_experience" not in completed_steps:
-        current_step = "trading_experience"
-    elif "bot_recommendation" not in completed_steps:
-        current_step = "bot_recommendation"
-    elif "broker_selection" not in completed_steps:
-        current_step = "broker_selection"
-    elif "budget_check" not in completed_steps:
-        current_step = "budget_check"
-    elif "profit_share_clarification" not in completed_steps:
-        current_step = "profit_share_clarification"
-    elif broker_preference and "has_broker_account" not in completed_steps:
-        current_step = "has_broker_account"
-    elif "instructions" not in completed_steps:
-        current_step = "instructions"
-    else:
-        current_step = "complete"
-
-    skill_content = _load_onboarding_skill()
-    return (
-        f"{RECOMMENDED_PROMPT_PREFIX}\n"
-        "You are the Onboarding Agent. Your role is to guide new leads through the onboarding process step by step.\n"
-        "\n"
-        "Lead information (ALREADY PROVIDED - DO NOT ASK FOR THIS):\n"
-        f"- Name: {first_name}\n"
-        f"- Country: {country}\n"
-        "\n"
-        f"CRITICAL: The lead's country is already known ({country}). DO NOT ask the user for their country. "
-        "Use the provided country when calling get_country_offers(country). If country shows \"Unknown\", you may ask for it; otherwise use the provided value.\n"
-        "\n"
-        "Current onboarding state:\n"
-        f"- Completed steps: {completed_steps}\n"
-        f"- Trading experience: {trading_experience}\n"
-        f"- Previous broker: {previous_broker}\n"
-        f"- Trading type: {trading_type}\n"
-        f"- Bot preference: {bot_preference}\n"
-        f"- Broker preference: {broker_preference}\n"
-        f"- Budget confirmed: {budget_confirmed}\n"
-        f"- Budget amount: {budget_amount}\n"
-        f"- Demo offered: {demo_offered}\n"
-        f"- Instructions provided: {instructions_provided}\n"
-        f"- Onboarding complete: {onboarding_complete}\n"
-        f"- Has broker account: {has_broker_account}\n"
-        f"- Current step to work on: {current_step}\n"
-        "\n"
-        "You have access to the **onboarding skill** below. Follow it. Use the tools (get_country_offers, get_broker_assets, update_onboarding_state, update_lead_info) as the skill describes. "
-        "Do not copy-paste raw JSON to the user; use tool output to reply in natural language.\n"
-        "\n"
-        "---\n"
-        "## Onboarding skill\n"
-        "\n"
-        f"{skill_content}"
+    return _render_onboarding_instructions(
+        ctx.first_name or "there",
+        ctx.country or "Unknown",
+        OnboardingSnapshot.from_state(ctx.onboarding_state),
     )
 
 
@@ -199,127 +308,161 @@ onboarding_agent = Agent[AirlineAgentChatContext](
     model=MODEL,
     handoff_description="Guides new leads through onboarding: trading experience, budget, broker setup.",
     instructions=onboarding_instructions,
-    tools=[
-        tool
-        for tool in [get_country_offers, get_broker_assets, update_lead_info, update_onboarding_state]
-        if tool is not None
-    ],  # Add tools if available
-    input_guardrails=[relevance_guardrail, jailbreak_guardrail],
+    # Independent lookups (e.g. lead info + state updates, or several broker assets) in one turn.
+    model_settings=_prompt_cache_settings("onboarding", _ONBOARDING_STATIC_PREFIX, MODEL, parallel_tool_calls=True),
+    tools=[get_country_offers, get_broker_assets, get_broker_assets_batch, update_lead_info, update_onboarding_state],
+    input_guardrails=_INPUT_GUARDRAILS,
 )
 
 
+# Static triage routing policy, built once at import. The new-lead routing block and the
+# STATE block are appended after it so the prefix stays identical across turns.
+_TRIAGE_STATIC_PREFIX = sys.intern(
+    f"{_PROMPT_PREAMBLE}"
+    "You are a helpful triaging agent. Understand what the customer needs and route them to the right specialist agent. "
+    "new_lead and onboarding_complete are in the STATE block at the end of these instructions.\n\n"
+    "ROUTING (first match wins):\n"
+    "1. Scheduling Agent: the customer says 'call' (including as the answer to the greeting's call-or-chat question), asks for a call, or wants to schedule one. "
+    "Also when they only say 'yes', 'sure', 'ok', 'yes please' or 'that works' right after the Scheduling Agent offered a callback (e.g. 20 minutes or 2–4 hours): "
+    "hand off immediately without asking anything; we already have their phone number and timezone from the campaign.\n"
+    "2. Investments FAQ Agent: specific questions about trading bots, stocks, investments, fees, profit splits, setup process, etc.\n"
+    "3. Onboarding Agent: DEFAULT for a new lead (new_lead=True) with onboarding_complete=False. Route them proactively. "
+    "A new lead answering 'chat' to the greeting is a direct trigger: hand off immediately, do not just acknowledge it. "
+    "Never route to onboarding by default once onboarding_complete=True.\n"
+    "4. Otherwise (not a new lead, or onboarding complete): engage in conversation, or ask for clarification if the message is unclear, before routing. "
+    "A 'chat' reply from them is just acknowledged.\n\n"
+    "USER CORRECTIONS: if the user corrects a conversation variable (at minimum country), acknowledge briefly, call update_lead_info(...) to persist it "
+    "(e.g. country is Austria but they say 'Actually I'm from Australia' -> update_lead_info(country='Australia')), then continue routing.\n\n"
+    "When the request is clear, hand off immediately and let the specialist do multi-step work without asking the user to confirm after each tool call. "
+    "Never emit more than one handoff per message: at most one tool call of prep, then hand off once.\n\n"
+    "---\n"
+)
+
+_TRIAGE_NEW_LEAD_ROUTING = sys.intern(
+    "THIS CUSTOMER: a new lead who hasn't completed onboarding. Route them to the Onboarding Agent unless they made a specific call or FAQ request.\n"
+    "\n"
+)
+# Both triage prefixes are joined once here, so a turn only appends the STATE block.
+_TRIAGE_NEW_LEAD_PREFIX = sys.intern("".join((_TRIAGE_STATIC_PREFIX, _TRIAGE_NEW_LEAD_ROUTING)))
+
+
+@lru_cache(maxsize=16)
+def _render_triage_instructions(new_lead: bool, onboarding_complete: bool | None) -> str:
+    """Full triage prompt for one (new_lead, onboarding_complete) pair; only a handful exist."""
+    # Note: Don't route if user has made a specific request (call/FAQ)
+    # This will be handled by the agent's natural language understanding
+    should_route_to_onboarding = new_lead and not onboarding_complete
+    prefix = _TRIAGE_NEW_LEAD_PREFIX if should_route_to_onboarding else _TRIAGE_STATIC_PREFIX
+    state = {"new_lead": new_lead, "onboarding_complete": onboarding_complete}
+    return prefix + _state_block(state)
+
+
 def triage_instructions(
     run_context: RunContextWrapper[AirlineAgentChatContext], agent: Agent[AirlineAgentChatContext]
 ) -> str:
     ctx = run_context.context.state
     new_lead = ctx.new_lead or False
-    onboarding_state = ctx.onboarding_state or {}
-    completed_steps = onboarding_state.get("completed_steps", [])
-    onboarding_complete = onboarding_state.get("onboarding_complete", False)
-    
-    # Debug print to verify state values
-    print(f"[DEBUG] Triage Agent - new_lead={new_lead}, first_name={ctx.first_name}, country={ctx.country}, onboarding_complete={onboarding_complete}")
-    
-    # Determine if we should route to onboarding
-    # Note: Don't route if user has made a specific request (call/FAQ)
-    # This will be handled by the agent's natural language understanding
-    should_route_to_onboarding = (
-        new_lead and 
-        not onboarding_complete
-    )
-    
-    onboarding_instruction = ""
-    if should_route_to_onboarding:
-        onboarding_instruction = (
-            "\n\n"
-            "DEFAULT ROUTING - NEW LEAD ONBOARDING (PROACTIVE):\n"
-            "- This is a new lead (new_lead=True) who hasn't completed onboarding yet.\n"
-            "- DEFAULT ACTION: Route them to the Onboarding Agent proactively - this is the default behavior.\n"
-            "- The Onboarding Agent will guide them through the onboarding process step by step.\n"
-            "- Only override this default if there's a specific request (call or FAQ question) - those take priority.\n"
-            "- The goal is to be proactive and make things moving by routing to onboarding by default.\n"
-        )
-    
-    return (
-        f"{RECOMMENDED_PROMPT_PREFIX} "
-        "You are a helpful triaging agent. Your role is to understand what the customer needs and route them to the appropriate specialist agent.\n\n"
-        "IMPORTANT - USER CORRECTIONS:\n"
-        "- If the user corrects a conversation variable (at minimum country), you must:\n"
-        "  1) Acknowledge the correction briefly\n"
-        "  2) Call update_lead_info(...) to persist the corrected value so the UI variables panel updates\n"
-        "  3) Then continue routing normally\n"
-        "- Example: if country is Austria but user says 'Actually I'm from Australia', call update_lead_info(country='Australia').\n\n"
-        "ROUTING PRIORITY (in order):\n"
-        "1. Specific requests take priority (override default onboarding):\n"
-        "   - Scheduling Agent: When customer says 'call' or explicitly requests a call or wants to schedule a phone conversation. This includes when they respond 'call' to the initial greeting question asking about their preference.\n"
-        "   - Investments FAQ Agent: When customer asks specific questions about trading bots, stocks, investments, fees, profit splits, setup process, etc.\n"
-        "2. DEFAULT BEHAVIOR - New lead onboarding (proactive routing):\n"
-        "   - Onboarding Agent: If this is a new lead (new_lead=True) who hasn't completed onboarding (onboarding_complete=False), route them to the Onboarding Agent proactively as the default action.\n"
-        "   - This is the DEFAULT behavior for new leads - you should route to Onboarding Agent unless there's a specific request that requires Scheduling or FAQ Agent.\n"
-        "   - CRITICAL: When a new lead (new_lead=True) responds with 'chat' to the initial greeting, route them to the Onboarding Agent immediately to begin onboarding.\n"
-        "   - The goal is to be proactive - make things moving by routing new leads to onboarding by default.\n"
-        "   - IMPORTANT: If onboarding_complete=True, do NOT route to Onboarding Agent by default - the user has already completed onboarding.\n\n"
-        f"{onboarding_instruction}"
-        "When NOT to hand off:\n"
-        "- If customer hasn't asked a question yet and they're NOT a new lead - engage them in conversation first\n"
-        "- If the message is unclear and they're NOT a new lead - ask for clarification before routing\n"
-        "- If onboarding is already complete (onboarding_complete=True) - do NOT route to Onboarding Agent by default. Handle follow-up questions normally by routing to appropriate agents (Scheduling Agent, Investments FAQ Agent, etc.)\n\n"
-        "SPECIAL CASE - 'chat' response from new leads:\n"
-        "- When a new lead (new_lead=True) says 'chat', this is a direct trigger to begin onboarding - NOT just a preference.\n"
-        "- This MUST trigger an immediate handoff to the Onboarding Agent to begin the onboarding process.\n"
-        "- You MUST route them to the Onboarding Agent immediately - do NOT just acknowledge and continue.\n"
-        "- This is a specific action that requires routing to the Onboarding Agent - treat it the same as a specific request.\n"
-        "- Only if they're NOT a new lead or have completed onboarding should you acknowledge and continue naturally.\n\n"
-        "CALLBACK ACCEPTANCE - When the user says only 'yes', 'sure', 'ok', 'yes please', or 'that works' and the last assistant message was from the Scheduling Agent offering a callback (e.g. 20 minutes or 2–4 hours):\n"
-        "- Do NOT ask for phone number or timezone. We already have them from the campaign.\n"
-        "- Hand off immediately to the Scheduling Agent so it can send the confirmation and close the flow. Do not ask any questions.\n\n"
-        "If the request is clear and specific, hand off immediately and let the specialist complete multi-step work without asking the user to confirm after each tool call.\n"
-        "Never emit more than one handoff per message: do your prep (at most one tool call) and then hand off once."
+    onboarding_complete = OnboardingSnapshot.from_state(ctx.onboarding_state).onboarding_complete
+
+    logger.debug(
+        "Triage Agent - new_lead=%s, first_name=%s, country=%s, onboarding_complete=%s",
+        new_lead, ctx.first_name, ctx.country, onboarding_complete,
     )
+    return _render_triage_instructions(new_lead, onboarding_complete)
 
 
 triage_agent = Agent[AirlineAgentChatContext](
     name="Triage Agent",
-    model=MODEL,
+    model=TRIAGE_MODEL,
     handoff_description="Delegates requests to the right specialist agent (scheduling, investments FAQ, onboarding).",
     instructions=triage_instructions,
+    model_settings=_prompt_cache_settings("triage", _TRIAGE_STATIC_PREFIX, TRIAGE_MODEL),
     tools=[update_lead_info],
     handoffs=[],
-    input_guardrails=[relevance_guardrail, jailbreak_guardrail],
+    input_guardrails=_INPUT_GUARDRAILS,
 )
 
 
-async def on_onboarding_handoff(context: RunContextWrapper[AirlineAgentChatContext]) -> None:
+# Lead info last logged per thread by the onboarding handoff (bounded, oldest thread dropped first).
+# Retried or repeated handoffs with unchanged context log and warn only once.
+_HANDOFF_LOG_MAX_THREADS = 1024
+_handoff_logged_context: OrderedDict[str, tuple] = OrderedDict()
+
+
+def _handoff_context_is_new(thread_id: str | None, signature: tuple) -> bool:
+    if thread_id is None:
+        return True
+    if _handoff_logged_context.get(thread_id) == signature:
+        _handoff_logged_context.move_to_end(thread_id)
+        return False
+    _handoff_logged_context[thread_id] = signature
+    _handoff_logged_context.move_to_end(thread_id)
+    while len(_handoff_logged_context) > _HANDOFF_LOG_MAX_THREADS:
+        _handoff_logged_context.popitem(last=False)
+    return True
+
+
+def on_onboarding_handoff(context: RunContextWrapper[AirlineAgentChatContext]) -> None:
     """Ensure lead info and onboarding state are preserved when handing off to the onboarding agent."""
     ctx_state = context.context.state
-    # Get thread ID from the context
-    thread_id = None
-    if hasattr(context.context, 'thread') and context.context.thread:
-        thread_id = context.context.thread.id
+    thread = getattr(context.context, "thread", None)
+    thread_id = thread.id if thread else None
     
     # CRITICAL: Restore lead info from cache if context was reset during handoff
     if thread_id:
-        restore_lead_info_to_context(thread_id, ctx_state)
-        restore_onboarding_state_to_context(thread_id, ctx_state)
-        print(f"[DEBUG] Onboarding handoff - Restored context for thread {thread_id}")
-    
-    print(f"[DEBUG] Onboarding handoff - Context state: first_name={ctx_state.first_name}, country={ctx_state.country}, new_lead={ctx_state.new_lead}, email={ctx_state.email}, onboarding_state={ctx_state.onboarding_state}")
+        restore_thread_context(thread_id, ctx_state)
+
+    signature = (
+        ctx_state.first_name,
+        ctx_state.country,
+        ctx_state.new_lead,
+        ctx_state.email,
+        OnboardingSnapshot.from_state(ctx_state.onboarding_state),
+    )
+    if not _handoff_context_is_new(thread_id, signature):
+        return
+
+    logger.debug(
+        "Onboarding handoff - thread=%s, first_name=%s, country=%s, new_lead=%s, email=%s, onboarding_state=%s",
+        thread_id, ctx_state.first_name, ctx_state.country, ctx_state.new_lead, ctx_state.email, ctx_state.onboarding_state,
+    )
     
     # Validate that critical context is present
     if not ctx_state.country or ctx_state.country == "Unknown":
-        print(f"[WARNING] Country is missing or Unknown during onboarding handoff!")
+        logger.warning("Country is missing or Unknown during onboarding handoff")
     if not ctx_state.first_name:
-        print(f"[WARNING] First name is missing during onboarding handoff!")
+        logger.warning("First name is missing during onboarding handoff")
 
 
-# Set up handoff relationships
+# Set up handoff relationships. Each list is assigned outright so the graph has no duplicate edges.
 triage_agent.handoffs = [
     investments_faq_agent,
     scheduling_agent,
     handoff(agent=onboarding_agent, on_handoff=on_onboarding_handoff),
 ]
-investments_faq_agent.handoffs.append(triage_agent)
-investments_faq_agent.handoffs.append(onboarding_agent)
-scheduling_agent.handoffs.append(onboarding_agent)
-scheduling_agent.handoffs.append(triage_agent)
-onboarding_agent.handoffs.extend([scheduling_agent, investments_faq_agent, triage_agent])
\ No newline at end of file
+investments_faq_agent.handoffs = [triage_agent, onboarding_agent]
+scheduling_agent.handoffs = [onboarding_agent, triage_agent]
+onboarding_agent.handoffs = [scheduling_agent, investments_faq_agent, triage_agent]
+
+# Flat, read-only lookup: agent name -> agent.
+AGENTS_BY_NAME: Mapping[str, Agent[AirlineAgentChatContext]] = MappingProxyType(
+    {agent.name: agent for agent in (triage_agent, investments_faq_agent, scheduling_agent, onboarding_agent)}
+)
+
+
+def warm_prompt_caches() -> None:
+    """Render the shared prompt pieces once so the first turns after startup hit warm caches.
+
+    Covers every triage variant and the pre-resolved offer plans for each country group; the
+    per-lead onboarding render still happens on the lead's first turn.
+    """
+    for new_lead in (True, False):
+        for onboarding_complete in (False, True):
+            _render_triage_instructions(new_lead, onboarding_complete)
+    for step in _OFFER_FIELDS_BY_STEP:
+        for country_group in ("AUSTRALIA", "CANADA", "OTHER"):
+            _onboarding_plan(step, country_group)
+
+
+if os.environ.get("WARM_AGENTS"):
+    warm_prompt_caches()
@@ -1,5 +1,9 @@
 from __future__ import annotations as _annotations
 
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from typing import Any
+
 from chatkit.agents import AgentContext
 from pydantic import BaseModel
 
@@ -26,10 +30,51 @@ class AirlineAgentContext(BaseModel):
     #   "budget_amount": float | None,
     #   "demo_offered": bool | None,
     #   "instructions_provided": bool | None,
+    #   "has_broker_account": bool | None,
     #   "onboarding_complete": bool | None  # Set to True when user has opened broker account and set up copy trading
     # }
 
 
+@dataclass(frozen=True, slots=True)
+class OnboardingSnapshot:
+    """
+    Read-only, typed view of `AirlineAgentContext.onboarding_state`.
+    Built once per prompt render; hashable, so it can be used as a cache key.
+    """
+
+    completed_steps: tuple[str, ...] = ()
+    trading_experience: str | None = None
+    previous_broker: str | None = None
+    trading_type: str | None = None
+    bot_preference: str | None = None
+    broker_preference: str | None = None
+    budget_confirmed: bool | None = None
+    budget_amount: float | None = None
+    demo_offered: bool | None = None
+    instructions_provided: bool | None = None
+    has_broker_account: bool | None = None
+    onboarding_complete: bool | None = False
+
+    @classmethod
+    def from_state(cls, onboarding_state: Mapping[str, Any] | None) -> OnboardingSnapshot:
+        if not onboarding_state:
+            return _EMPTY_ONBOARDING_SNAPSHOT
+        return cls(
+            tuple(onboarding_state.get("completed_steps") or ()),
+            *map(onboarding_state.get, ONBOARDING_ANSWER_KEYS),
+            onboarding_state.get("onboarding_complete", False),
+        )
+
+    def answers(self) -> dict[str, Any]:
+        """The collected answers (everything but completed_steps and onboarding_complete)."""
+        return {key: getattr(self, key) for key in ONBOARDING_ANSWER_KEYS}
+
+
+# Answer fields in declaration order, between completed_steps and onboarding_complete.
+ONBOARDING_ANSWER_KEYS: tuple[str, ...] = tuple(f.name for f in fields(OnboardingSnapshot))[1:-1]
+_EMPTY_ONBOARDING_SNAPSHOT = OnboardingSnapshot()
+
+
 class AirlineAgentChatContext(AgentContext[dict]):
     """
     AgentContext wrapper used during ChatKit runs.
@@ -1,5 +1,11 @@
 """Module-level cache for lead information and onboarding state to persist across agent handoffs."""
 
+from __future__ import annotations as _annotations
+
+import logging
+
+logger = logging.getLogger(__name__)
+
 # Global cache: thread_id -> lead_info dict
 _lead_info_cache: dict[str, dict] = {}
 
@@ -61,14 +67,20 @@ def restore_onboarding_state_to_context(thread_id: str, context) -> None:
     cached = get_onboarding_state(thread_id)
     if not cached:
         return
-    
+
     # Restore onboarding_state if it's missing or empty
     if cached and (context.onboarding_state is None or not context.onboarding_state):
         context.onboarding_state = cached.copy()
-        print(f"[DEBUG] Restored onboarding_state from cache for thread {thread_id}")
+        logger.debug("Restored onboarding_state from cache for thread %s", thread_id)
     elif cached and context.onboarding_state:
         # Merge cached state with existing state (cached takes precedence for non-None values)
         for key, value in cached.items():
             if value is not None:
                 context.onboarding_state[key] = value
-        print(f"[DEBUG] Merged onboarding_state from cache for thread {thread_id}")
+        logger.debug("Merged onboarding_state from cache for thread %s", thread_id)
+
+
+def restore_thread_context(thread_id: str, context) -> None:
+    """Restore both the lead info and the onboarding state cached for a thread."""
+    restore_lead_info_to_context(thread_id, context)
+    restore_onboarding_state_to_context(thread_id, context)
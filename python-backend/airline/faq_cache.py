@@ -0,0 +1,144 @@
+"""In-process cache of Investments FAQ answers, keyed by the normalized customer question and
+the lead's country group (offers, brokers and minimums differ per country)."""
+
+from __future__ import annotations as _annotations
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+FAQ_CACHE_TTL_SECONDS = 60 * 60
+FAQ_CACHE_MAX_ENTRIES = 512
+# Very short messages ("ok", "why?") depend on conversation context and are never cached.
+FAQ_CACHE_MIN_WORDS = 3
+# Bump when the documents in the FAQ vector store change; older entries stop matching.
+FAQ_KNOWLEDGE_VERSION = 1
+# On an exact miss, a cached question whose words overlap this much (Jaccard) is reused, so
+# "what are the fees for the bot" and "what are the fees for your bot?" share an answer.
+FAQ_SIMILARITY_THRESHOLD = 0.8
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Questions about the lead's own account, or whose answer changes over time, are not cached.
+_UNCACHEABLE_RE = re.compile(
+    r"\bmy (account|balance|profits?|deposits?|withdrawals?|funds|money|trades?|bot|broker)\b"
+    r"|\b(today|tomorrow|yesterday|now|currently|current|latest|this (week|month|year)|price|rate)\b"
+)
+
+# Filler words ignored when comparing questions. Pronouns, auxiliaries and question words are kept:
+# they are what separates "do you have a gold bot?" from "i have a gold bot".
+_STOPWORDS = frozenset("a an the please of to for in on at with and or".split())
+# Leading words that make a message a question even without a question mark.
+_QUESTION_WORDS = frozenset({
+    "what", "whats", "how", "hows", "who", "why", "when", "where", "which", "is", "are", "can",
+    "do", "does", "will", "should", "could", "would",
+})
+
+# Global cache: key digest -> (stored_at, (knowledge_version, country_group), content_words, answer);
+# ordered oldest -> most recently used
+_faq_answer_cache: OrderedDict[bytes, tuple[float, tuple[int, str], frozenset[str], str]] = OrderedDict()
+_lock = threading.RLock()
+_stats = {"hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace so trivially different phrasings share a key."""
+    if not question:
+        return ""
+    text = _PUNCTUATION_RE.sub(" ", question.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def is_cacheable_question(question: str) -> bool:
+    """True if answers to this question can be shared across leads."""
+    normalized = normalize_question(question)
+    return len(normalized.split(" ")) >= FAQ_CACHE_MIN_WORDS and not _UNCACHEABLE_RE.search(normalized)
+
+
+def looks_like_question(message: str) -> bool:
+    """True for messages phrased as a question; statements (e.g. onboarding answers) are not."""
+    normalized = normalize_question(message)
+    return bool(normalized) and (message.rstrip().endswith("?") or normalized.split(" ", 1)[0] in _QUESTION_WORDS)
+
+
+def _content_words(question: str) -> frozenset[str]:
+    return frozenset(normalize_question(question).split(" ")) - _STOPWORDS
+
+
+def _cache_key(question: str, country_group: str) -> bytes | None:
+    if not is_cacheable_question(question):
+        return None
+    text = f"{FAQ_KNOWLEDGE_VERSION}\0{country_group}\0{normalize_question(question)}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _similar_key(words: frozenset[str], country_group: str) -> bytes | None:
+    """Key of the most similar live entry at or above FAQ_SIMILARITY_THRESHOLD; caller holds _lock."""
+    if not words:
+        return None
+    now = time.monotonic()
+    partition = (FAQ_KNOWLEDGE_VERSION, country_group)
+    best_key, best_score = None, FAQ_SIMILARITY_THRESHOLD
+    for key, (stored_at, entry_partition, cached_words, _answer) in _faq_answer_cache.items():
+        if entry_partition != partition or now - stored_at > FAQ_CACHE_TTL_SECONDS:
+            continue
+        score = len(words & cached_words) / len(words | cached_words)
+        if score >= best_score:
+            best_key, best_score = key, score
+    return best_key
+
+
+def get_cached_faq_answer(question: str, country_group: str = "") -> str | None:
+    """Return a cached answer for the question (or a near-identical one) asked from this country
+    group, or None on a miss."""
+    key = _cache_key(question, country_group)
+    if key is None:
+        return None
+    with _lock:
+        entry = _faq_answer_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] > FAQ_CACHE_TTL_SECONDS:
+            del _faq_answer_cache[key]
+            _stats["expirations"] += 1
+            entry = None
+        if entry is None:
+            key = _similar_key(_content_words(question), country_group) if looks_like_question(question) else None
+            if key is None:
+                _stats["misses"] += 1
+                return None
+            entry = _faq_answer_cache[key]
+            _stats["similar_hits"] += 1
+        _faq_answer_cache.move_to_end(key)
+        _stats["hits"] += 1
+        return entry[3]
+
+
+def set_cached_faq_answer(question: str, answer: str, country_group: str = "") -> None:
+    """Store an FAQ answer for leads in this country group, evicting the least recently used entry when full."""
+    key = _cache_key(question, country_group)
+    if key is None or not answer:
+        return
+    with _lock:
+        _faq_answer_cache[key] = (
+            time.monotonic(), (FAQ_KNOWLEDGE_VERSION, country_group), _content_words(question), answer
+        )
+        _faq_answer_cache.move_to_end(key)
+        _stats["stores"] += 1
+        while len(_faq_answer_cache) > FAQ_CACHE_MAX_ENTRIES:
+            _faq_answer_cache.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def faq_cache_stats() -> dict[str, int]:
+    """Snapshot of hit/miss/store/eviction counters plus the current size."""
+    with _lock:
+        return {**_stats, "size": len(_faq_answer_cache)}
+
+
+def clear_faq_cache() -> None:
+    """Drop all cached answers and reset the counters."""
+    with _lock:
+        _faq_answer_cache.clear()
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,61 @@
+"""Conversation-history trimming applied to every model call (RunConfig.call_model_input_filter)."""
+
+from __future__ import annotations as _annotations
+
+import json
+from typing import Any
+
+from agents.run import CallModelData, ModelInputData
+
+# Approximate token budget for the conversation history sent with each model call.
+HISTORY_TOKEN_BUDGET = 3000
+# Rough chars-per-token ratio for English chat text; good enough for a budget, no tokenizer needed.
+_CHARS_PER_TOKEN = 4
+
+_TRIMMED_NOTE = {
+    "role": "developer",
+    "content": (
+        "Earlier messages in this conversation were omitted for length. "
+        "Rely on your instructions and the remaining messages for anything said before this point."
+    ),
+}
+
+
+def estimate_tokens(item: Any) -> int:
+    """Approximate token count of one input item."""
+    if isinstance(item, str):
+        text = item
+    else:
+        text = json.dumps(item, default=str, ensure_ascii=False)
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def _is_user_message(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("role") == "user"
+
+
+def trim_history(items: list[Any], budget: int = HISTORY_TOKEN_BUDGET) -> list[Any]:
+    """Keep the most recent items that fit the token budget, cutting only at user messages.
+
+    Cutting at a user message never separates a tool call from its output. Everything from the
+    latest user message onward is always kept, even if it alone exceeds the budget.
+    """
+    total = 0
+    cut = None
+    for index in range(len(items) - 1, -1, -1):
+        total += estimate_tokens(items[index])
+        if _is_user_message(items[index]):
+            if cut is not None and total > budget:
+                return [_TRIMMED_NOTE, *items[cut:]]
+            cut = index
+    # Within budget (or no earlier user message to cut at): send the history as is.
+    return items
+
+
+def trim_model_input(data: CallModelData[Any]) -> ModelInputData:
+    """call_model_input_filter: send only the recent part of the history to the model."""
+    model_data = data.model_data
+    trimmed = trim_history(model_data.input)
+    if trimmed is model_data.input:
+        return model_data
+    return ModelInputData(input=trimmed, instructions=model_data.instructions)
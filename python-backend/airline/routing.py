@@ -0,0 +1,247 @@
+"""Lightweight intent classifier and learned-route cache used to skip the triage turn for
+unambiguous requests, plus an offline batch router for replays and evaluation."""
+
+from __future__ import annotations as _annotations
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal
+
+from pydantic import BaseModel
+
+from agents import Agent, Runner
+
+from .faq_cache import normalize_question
+
+Intent = Literal["investments_faq", "scheduling", "onboarding", "unknown"]
+
+# Minimum confidence for starting a run directly at the specialist agent instead of triage.
+SHORT_CIRCUIT_CONFIDENCE = 0.85
+
+_WORD_RE = re.compile(r"[a-z0-9$]+")
+
+# Whole-message replies that unambiguously ask for a phone call (e.g. answering the greeting).
+_CALL_REPLIES = frozenset({
+    "call",
+    "a call",
+    "call please",
+    "call me",
+    "please call me",
+    "phone",
+    "phone call",
+    "a phone call",
+    "i prefer a call",
+    "i would prefer a call",
+    "i'd prefer a call",
+})
+# Whole-message replies choosing to chat (the other answer to the greeting).
+_CHAT_REPLIES = frozenset({
+    "chat",
+    "chat here",
+    "chat please",
+    "lets chat",
+    "let's chat",
+    "i prefer to chat",
+    "i prefer chat",
+    "i'd prefer to chat",
+    "i would prefer to chat",
+    "here",
+    "text",
+    "texting",
+})
+_CALL_PATTERNS = (
+    re.compile(r"\b(schedule|book|arrange|set up)\b.{0,20}\bcall\b"),
+    re.compile(r"\bcall me\b"),
+    re.compile(r"\b(speak|talk) (to|with) (someone|a person|an agent|a human|a representative)\b"),
+)
+# Declining a call ("don't call me", "no need to call me") or asking about one ("who will call me?")
+# also matches the patterns above; such messages go to triage instead.
+_CALL_REFUSAL_RE = re.compile(r"\b(don'?t|do not|no need to|never|not|who)\b.{0,20}\bcall\b")
+
+# Topics the Investments FAQ knowledge base covers.
+_FAQ_TOPICS = (
+    "fee", "fees", "commission", "profit", "profits", "minimum", "deposit", "withdraw", "withdrawal",
+    "withdrawals", "risk", "risks", "safe", "regulated", "invest", "investment", "returns", "bot", "bots",
+    "owns", "owner", "leverage", "drawdown", "strategy", "broker", "brokers",
+)
+_QUESTION_WORDS = frozenset({
+    "what", "whats", "how", "hows", "who", "why", "when", "where", "which", "is", "are", "can",
+    "do", "does", "will", "should",
+})
+
+
+@dataclass(frozen=True)
+class IntentPrediction:
+    intent: Intent
+    confidence: float
+
+
+_UNKNOWN = IntentPrediction("unknown", 0.0)
+
+
+def classify_intent(user_msg: str, *, new_lead: bool = False, onboarding_complete: bool = False) -> IntentPrediction:
+    """Classify a user message into a routing intent with a heuristic confidence score.
+
+    A bare "chat" reply only means onboarding for a new lead who has not finished it yet.
+    """
+    text = (user_msg or "").strip().lower()
+    if not text:
+        return _UNKNOWN
+    words = _WORD_RE.findall(text.replace("'", ""))
+    if not words:
+        return _UNKNOWN
+    if text.rstrip(".!") in _CHAT_REPLIES:
+        return IntentPrediction("onboarding", 0.95) if new_lead and not onboarding_complete else _UNKNOWN
+
+    wants_call = text.rstrip(".!") in _CALL_REPLIES or (
+        any(p.search(text) for p in _CALL_PATTERNS) and not _CALL_REFUSAL_RE.search(text)
+    )
+    is_question = text.endswith("?") or words[0] in _QUESTION_WORDS
+    faq_topic = any(topic in words for topic in _FAQ_TOPICS)
+
+    if wants_call and faq_topic:
+        # Mixed request; let triage decide.
+        return IntentPrediction("unknown", 0.5)
+    if wants_call:
+        return IntentPrediction("scheduling", 0.95)
+    if faq_topic and is_question:
+        return IntentPrediction("investments_faq", 0.9)
+    if faq_topic:
+        return IntentPrediction("investments_faq", 0.6)
+    return _UNKNOWN
+
+
+# --- Learned routes: triage handoffs replayed for repeated (message, previous question, lead flags) ---
+
+ROUTE_CACHE_MAX_ENTRIES = 1024
+# A route is replayed only after triage has made the same decision this many times in a row.
+ROUTE_CACHE_MIN_OBSERVATIONS = 2
+# Replayed routes skip triage, so they are re-checked against a real triage turn this long after
+# triage last confirmed them.
+ROUTE_CACHE_TTL_SECONDS = 6 * 60 * 60
+# Bump when the agent prompts or skills change how triage routes; older routes stop matching.
+ROUTE_CACHE_VERSION = 1
+
+# key digest -> (agent name triage chose, consecutive observations, last triage observation);
+# oldest -> most recently used
+_learned_routes: OrderedDict[bytes, tuple[str, int, float]] = OrderedDict()
+_route_lock = threading.Lock()
+
+
+def _route_key(user_msg: str, previous_reply: str | None, new_lead: bool, onboarding_complete: bool) -> bytes | None:
+    message = normalize_question(user_msg)
+    if not message:
+        return None
+    # The last line of the previous assistant reply is the question being answered; earlier lines
+    # (e.g. the greeting with the lead's name) would only fragment the cache.
+    question = normalize_question((previous_reply or "").strip().rsplit("\n", 1)[-1])
+    text = f"{ROUTE_CACHE_VERSION}\0{message}\0{question}\0{int(bool(new_lead))}{int(bool(onboarding_complete))}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def learned_route(
+    user_msg: str, previous_reply: str | None, new_lead: bool, onboarding_complete: bool
+) -> str | None:
+    """Return the agent name triage consistently chose for this message in this situation, if any."""
+    key = _route_key(user_msg, previous_reply, new_lead, onboarding_complete)
+    if key is None:
+        return None
+    with _route_lock:
+        entry = _learned_routes.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > ROUTE_CACHE_TTL_SECONDS:
+            del _learned_routes[key]
+            return None
+        if entry[1] < ROUTE_CACHE_MIN_OBSERVATIONS:
+            return None
+        _learned_routes.move_to_end(key)
+        return entry[0]
+
+
+def remember_route(
+    user_msg: str, previous_reply: str | None, new_lead: bool, onboarding_complete: bool, agent_name: str
+) -> None:
+    """Record where a full triage turn sent this message; a different decision restarts the count."""
+    key = _route_key(user_msg, previous_reply, new_lead, onboarding_complete)
+    if key is None:
+        return
+    with _route_lock:
+        previous = _learned_routes.get(key)
+        count = previous[1] + 1 if previous is not None and previous[0] == agent_name else 1
+        _learned_routes[key] = (agent_name, count, time.monotonic())
+        _learned_routes.move_to_end(key)
+        while len(_learned_routes) > ROUTE_CACHE_MAX_ENTRIES:
+            _learned_routes.popitem(last=False)
+
+
+def forget_route(user_msg: str, previous_reply: str | None, new_lead: bool, onboarding_complete: bool) -> None:
+    """Drop a learned route, e.g. after the replayed agent handed the message straight on."""
+    key = _route_key(user_msg, previous_reply, new_lead, onboarding_complete)
+    if key is None:
+        return
+    with _route_lock:
+        _learned_routes.pop(key, None)
+
+
+def clear_learned_routes() -> None:
+    """Forget all learned routes."""
+    with _route_lock:
+        _learned_routes.clear()
+
+
+# --- Offline batch routing (replays / evaluation only; the live chat routes one message at a time) ---
+
+Route = Literal["onboarding", "scheduling", "investments_faq", "triage"]
+
+BATCH_TRIAGE_MODEL = "gpt-4.1-mini"
+BATCH_TRIAGE_SIZE = 6
+
+
+class RouteDecision(BaseModel):
+    id: int
+    route: Route
+
+
+class BatchRouteOutput(BaseModel):
+    decisions: list[RouteDecision]
+
+
+batch_triage_agent = Agent(
+    name="Batch Triage Classifier",
+    model=BATCH_TRIAGE_MODEL,
+    instructions=(
+        "You route customer messages for a trading-bot service. You receive a numbered list of independent "
+        "messages. For each one return {id, route} where route is:\n"
+        "- scheduling: the customer wants a phone call or to schedule one\n"
+        "- investments_faq: a specific question about trading bots, investments, fees, profit share, minimums, "
+        "risks, accounts or similar\n"
+        "- onboarding: a new lead ready to get started (e.g. replying 'chat' to the greeting)\n"
+        "- triage: anything else or unclear\n"
+        "Return exactly one decision per message id."
+    ),
+    output_type=BatchRouteOutput,
+)
+
+
+async def batch_triage(messages: list[str], batch_size: int = BATCH_TRIAGE_SIZE) -> list[RouteDecision]:
+    """Route many historical messages with one model call per batch of `batch_size`.
+
+    Returns one decision per input message, in order; messages the model skipped fall back to triage.
+    """
+    decisions: list[RouteDecision] = []
+    for offset in range(0, len(messages), batch_size):
+        batch = messages[offset:offset + batch_size]
+        # One line per message so the numbering stays unambiguous.
+        prompt = "\n".join(f"{number}. {' '.join(message.split())}" for number, message in enumerate(batch, start=1))
+        result = await Runner.run(batch_triage_agent, prompt)
+        routes = {d.id: d.route for d in result.final_output_as(BatchRouteOutput).decisions}
+        decisions.extend(
+            RouteDecision(id=offset + number, route=routes.get(number, "triage"))
+            for number in range(1, len(batch) + 1)
+        )
+    return decisions
@@ -0,0 +1,46 @@
+import unittest
+from types import SimpleNamespace
+
+from agents import Handoff, RunContextWrapper
+
+from airline import agents
+from airline.context import AirlineAgentContext
+from airline.history import estimate_tokens
+
+
+class TestPromptSize(unittest.TestCase):
+    def test_triage_prompt_stays_compact(self):
+        # Triage runs at the start of most turns; keep its prompt (SDK preamble included) small.
+        self.assertLess(estimate_tokens(agents._TRIAGE_NEW_LEAD_PREFIX), 750)
+
+
+class TestHandoffGraph(unittest.TestCase):
+    def test_each_agent_lists_a_handoff_target_once(self):
+        for name, agent in agents.AGENTS_BY_NAME.items():
+            targets = [h.agent_name if isinstance(h, Handoff) else h.name for h in agent.handoffs]
+            with self.subTest(agent=name):
+                self.assertEqual(len(targets), len(set(targets)))
+                self.assertLessEqual(set(targets), set(agents.AGENTS_BY_NAME))
+
+
+class TestOnboardingHandoffLogging(unittest.TestCase):
+    def tearDown(self):
+        agents._handoff_logged_context.clear()
+
+    def test_unchanged_context_is_logged_once_per_thread(self):
+        state = AirlineAgentContext(first_name="Dana", country="Unknown")
+        context = RunContextWrapper(context=SimpleNamespace(state=state, thread=SimpleNamespace(id="thr_handoff_log")))
+
+        with self.assertLogs(agents.logger, level="WARNING") as logs:
+            agents.on_onboarding_handoff(context)
+            agents.on_onboarding_handoff(context)
+            state.country = "Canada"
+            agents.on_onboarding_handoff(context)
+            state.country = "Unknown"
+            agents.on_onboarding_handoff(context)
+
+        self.assertEqual(len(logs.records), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Tests for the in-process FAQ answer cache."""
+
+import unittest
+from unittest import mock
+
+from airline import faq_cache
+from airline.faq_cache import (
+    clear_faq_cache,
+    faq_cache_stats,
+    get_cached_faq_answer,
+    looks_like_question,
+    normalize_question,
+    set_cached_faq_answer,
+)
+
+
+class TestFaqCache(unittest.TestCase):
+    def setUp(self):
+        clear_faq_cache()
+
+    def tearDown(self):
+        clear_faq_cache()
+
+    def test_normalized_phrasings_share_an_entry(self):
+        set_cached_faq_answer("What is the minimum deposit?", "The minimum is $500.")
+        self.assertEqual(get_cached_faq_answer("  what is the MINIMUM deposit "), "The minimum is $500.")
+        self.assertEqual(normalize_question("Fees, please!?"), "fees please")
+
+    def test_near_identical_phrasings_share_an_answer(self):
+        set_cached_faq_answer("What are the fees for the bot?", "35% of monthly profit.")
+        self.assertEqual(get_cached_faq_answer("what are the fees for your bot"), "35% of monthly profit.")
+        self.assertIsNone(get_cached_faq_answer("what are the withdrawal fees"))
+        self.assertEqual(faq_cache_stats()["similar_hits"], 1)
+
+    def test_statements_do_not_match_cached_questions(self):
+        set_cached_faq_answer("Do you have a gold bot?", "Yes, we have a Gold bot.")
+        set_cached_faq_answer("Is the bot safe?", "It trades with strict risk limits.")
+        self.assertIsNone(get_cached_faq_answer("I have a gold bot"))
+        self.assertIsNone(get_cached_faq_answer("the bot is safe"))
+        self.assertFalse(looks_like_question("I have a gold bot"))
+        self.assertTrue(looks_like_question("is the bot safe"))
+        self.assertEqual(faq_cache_stats()["similar_hits"], 0)
+
+    def test_answers_are_scoped_to_the_country_group(self):
+        set_cached_faq_answer("which brokers do you support", "Vantage and PU Prime.", "CANADA")
+        self.assertEqual(get_cached_faq_answer("which brokers do you support", "CANADA"), "Vantage and PU Prime.")
+        self.assertIsNone(get_cached_faq_answer("which brokers do you support", "AUSTRALIA"))
+        self.assertIsNone(get_cached_faq_answer("which brokers are supported", "AUSTRALIA"))
+
+    def test_short_messages_are_not_cached(self):
+        set_cached_faq_answer("why?", "Because.")
+        self.assertIsNone(get_cached_faq_answer("why?"))
+
+    def test_personal_and_time_sensitive_questions_are_not_cached(self):
+        set_cached_faq_answer("what is my account balance", "You have $1,000.")
+        set_cached_faq_answer("what is the gold price today", "About $2,000.")
+        self.assertIsNone(get_cached_faq_answer("what is my account balance"))
+        self.assertIsNone(get_cached_faq_answer("what is the gold price today"))
+        self.assertEqual(faq_cache_stats()["stores"], 0)
+
+    def test_knowledge_version_bump_invalidates_entries(self):
+        set_cached_faq_answer("who owns the account", "You do.")
+        with mock.patch.object(faq_cache, "FAQ_KNOWLEDGE_VERSION", faq_cache.FAQ_KNOWLEDGE_VERSION + 1):
+            self.assertIsNone(get_cached_faq_answer("who owns the account"))
+        self.assertEqual(get_cached_faq_answer("who owns the account"), "You do.")
+        self.assertEqual(faq_cache_stats()["hits"], 1)
+        self.assertEqual(faq_cache_stats()["misses"], 1)
+
+    def test_expired_entries_are_dropped(self):
+        with mock.patch.object(faq_cache.time, "monotonic", return_value=1000.0):
+            set_cached_faq_answer("how do withdrawals work", "Via the broker portal.")
+        later = 1000.0 + faq_cache.FAQ_CACHE_TTL_SECONDS + 1
+        with mock.patch.object(faq_cache.time, "monotonic", return_value=later):
+            self.assertIsNone(get_cached_faq_answer("how do withdrawals work"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        with mock.patch.object(faq_cache, "FAQ_CACHE_MAX_ENTRIES", 2):
+            set_cached_faq_answer("question number one", "a1")
+            set_cached_faq_answer("question number two", "a2")
+            get_cached_faq_answer("question number one")
+            set_cached_faq_answer("question number three", "a3")
+        self.assertEqual(get_cached_faq_answer("question number one"), "a1")
+        self.assertIsNone(get_cached_faq_answer("question number two"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from agents import RunContextWrapper
+
+from airline import guardrails
+from airline.guardrails import ScreeningOutput, jailbreak_guardrail, relevance_guardrail
+
+
+class TestCombinedScreening(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        guardrails.clear_screening_cache()
+
+    def tearDown(self):
+        guardrails.clear_screening_cache()
+
+    async def test_both_guardrails_share_one_screening_call(self):
+        verdict = ScreeningOutput(
+            relevance_reasoning="off topic", is_relevant=False, jailbreak_reasoning="fine", is_safe=True
+        )
+        calls = 0
+
+        async def fake_run(agent, input, context=None):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            return SimpleNamespace(final_output_as=lambda _type: verdict)
+
+        context = RunContextWrapper(context=SimpleNamespace())
+        with mock.patch.object(guardrails.Runner, "run", side_effect=fake_run):
+            relevance, jailbreak = await asyncio.gather(
+                relevance_guardrail.run(context=context, agent=None, input="book me a flight"),
+                jailbreak_guardrail.run(context=context, agent=None, input="book me a flight"),
+            )
+
+        self.assertEqual(calls, 1)
+        self.assertTrue(relevance.output.tripwire_triggered)
+        self.assertEqual(relevance.output.output_info.reasoning, "off topic")
+        self.assertFalse(jailbreak.output.tripwire_triggered)
+        self.assertEqual(guardrails._inflight_screens, {})
+
+    async def test_repeated_input_reuses_the_verdict(self):
+        verdict = ScreeningOutput(relevance_reasoning="ok", is_relevant=True, jailbreak_reasoning="ok", is_safe=True)
+        run = mock.AsyncMock(return_value=SimpleNamespace(final_output_as=lambda _type: verdict))
+
+        with mock.patch.object(guardrails.Runner, "run", run):
+            for _ in range(2):
+                # A fresh context per turn, as the server builds one for every request.
+                context = RunContextWrapper(context=SimpleNamespace())
+                result = await relevance_guardrail.run(context=context, agent=None, input="what are the fees")
+                self.assertFalse(result.output.tripwire_triggered)
+
+        self.assertEqual(run.await_count, 1)
+
+    async def test_screen_for_cached_answers_reuses_the_guardrail_verdict(self):
+        verdict = ScreeningOutput(relevance_reasoning="ok", is_relevant=True, jailbreak_reasoning="prompt leak", is_safe=False)
+        run = mock.AsyncMock(return_value=SimpleNamespace(final_output_as=lambda _type: verdict))
+        context = RunContextWrapper(context=SimpleNamespace())
+
+        with mock.patch.object(guardrails.Runner, "run", run):
+            self.assertFalse(await guardrails.input_passes_screening(context, "what are the fees"))
+            result = await jailbreak_guardrail.run(context=context, agent=None, input="what are the fees")
+
+        self.assertTrue(result.output.tripwire_triggered)
+        self.assertEqual(run.await_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
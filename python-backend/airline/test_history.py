@@ -0,0 +1,42 @@
+import unittest
+
+from airline.history import trim_history
+
+
+def _turn(n: int, size: int = 400) -> list[dict]:
+    return [
+        {"role": "user", "content": f"question {n} " + "x" * size},
+        {"type": "function_call", "call_id": f"c{n}", "name": "lookup", "arguments": "{}"},
+        {"type": "function_call_output", "call_id": f"c{n}", "output": "y" * size},
+        {"role": "assistant", "content": f"answer {n}"},
+    ]
+
+
+class TestTrimHistory(unittest.TestCase):
+    def test_short_history_is_untouched(self):
+        items = _turn(1)
+        self.assertIs(trim_history(items, budget=3000), items)
+
+    def test_greeting_first_history_under_budget_is_untouched(self):
+        items = [
+            {"role": "assistant", "content": "Hi Dana! Do you prefer a call or would you rather we chat here?"},
+            {"role": "user", "content": "chat"},
+        ]
+        self.assertIs(trim_history(items, budget=3000), items)
+
+    def test_long_history_is_cut_at_a_user_message(self):
+        items = [item for n in range(20) for item in _turn(n)]
+        trimmed = trim_history(items, budget=1000)
+        self.assertLess(len(trimmed), len(items))
+        self.assertEqual(trimmed[0]["role"], "developer")
+        self.assertEqual(trimmed[1]["role"], "user")
+        self.assertEqual(trimmed[-4:], items[-4:])
+
+    def test_latest_turn_is_kept_even_over_budget(self):
+        items = _turn(1) + _turn(2, size=10_000)
+        trimmed = trim_history(items, budget=100)
+        self.assertEqual(trimmed[1:], items[4:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from airline import routing
+from airline.routing import (
+    SHORT_CIRCUIT_CONFIDENCE,
+    BatchRouteOutput,
+    RouteDecision,
+    batch_triage,
+    classify_intent,
+    clear_learned_routes,
+    forget_route,
+    learned_route,
+    remember_route,
+)
+
+
+class TestClassifyIntent(unittest.TestCase):
+    def assertRoutes(self, text: str, intent: str):
+        prediction = classify_intent(text)
+        self.assertEqual(prediction.intent, intent, text)
+        self.assertGreaterEqual(prediction.confidence, SHORT_CIRCUIT_CONFIDENCE, text)
+
+    def assertFallsBackToTriage(self, text: str):
+        self.assertLess(classify_intent(text).confidence, SHORT_CIRCUIT_CONFIDENCE, text)
+
+    def test_call_requests_route_to_scheduling(self):
+        self.assertRoutes("Call", "scheduling")
+        self.assertRoutes("I'd prefer a call.", "scheduling")
+        self.assertRoutes("Can we schedule a call tomorrow?", "scheduling")
+
+    def test_faq_questions_route_to_faq(self):
+        self.assertRoutes("What are the fees?", "investments_faq")
+        self.assertRoutes("what is the minimum to invest", "investments_faq")
+
+    def test_chat_reply_routes_new_leads_to_onboarding(self):
+        prediction = classify_intent("Chat!", new_lead=True)
+        self.assertEqual(prediction.intent, "onboarding")
+        self.assertGreaterEqual(prediction.confidence, SHORT_CIRCUIT_CONFIDENCE)
+        self.assertFallsBackToTriage("chat")
+        self.assertLess(classify_intent("chat", new_lead=True, onboarding_complete=True).confidence, SHORT_CIRCUIT_CONFIDENCE)
+
+    def test_ambiguous_messages_fall_back_to_triage(self):
+        self.assertFallsBackToTriage("chat")
+        self.assertFallsBackToTriage("yes")
+        self.assertFallsBackToTriage("I want to invest")
+        self.assertFallsBackToTriage("Call me about the fees?")
+
+    def test_declined_or_questioned_calls_do_not_route_to_scheduling(self):
+        for text in (
+            "don't call me",
+            "Please do not call me, I'd rather chat",
+            "no need to call me",
+            "Never call me again",
+            "Who will call me?",
+        ):
+            self.assertNotEqual(classify_intent(text).intent, "scheduling", text)
+            self.assertFallsBackToTriage(text)
+        self.assertFallsBackToTriage("")
+
+
+class TestLearnedRoutes(unittest.TestCase):
+    GREETING = "Hi Dana!\nLet's start with a short conversation.\n\nDo you prefer a call or would you rather we chat here?"
+
+    def setUp(self):
+        clear_learned_routes()
+
+    def tearDown(self):
+        clear_learned_routes()
+
+    def test_route_is_replayed_after_consistent_decisions(self):
+        remember_route("chat", self.GREETING, True, False, "Onboarding Agent")
+        self.assertIsNone(learned_route("chat", self.GREETING, True, False))
+        remember_route("Chat!", self.GREETING, True, False, "Onboarding Agent")
+        # Only the question being answered matters, not the greeting with the lead's name.
+        other_greeting = self.GREETING.replace("Dana", "Sam")
+        self.assertEqual(learned_route("chat", other_greeting, True, False), "Onboarding Agent")
+
+    def test_situation_is_part_of_the_key(self):
+        for _ in range(2):
+            remember_route("chat", self.GREETING, True, False, "Onboarding Agent")
+        self.assertIsNone(learned_route("chat", self.GREETING, False, False))
+        self.assertIsNone(learned_route("chat", "Anything else I can help with?", True, False))
+
+    def test_conflicting_decision_restarts_the_count(self):
+        for _ in range(2):
+            remember_route("yes", self.GREETING, True, False, "Onboarding Agent")
+        remember_route("yes", self.GREETING, True, False, "Triage Agent")
+        self.assertIsNone(learned_route("yes", self.GREETING, True, False))
+
+    def test_routes_expire_and_can_be_forgotten(self):
+        with mock.patch.object(routing.time, "monotonic", return_value=1000.0):
+            for _ in range(2):
+                remember_route("chat", self.GREETING, True, False, "Onboarding Agent")
+        later = 1000.0 + routing.ROUTE_CACHE_TTL_SECONDS + 1
+        with mock.patch.object(routing.time, "monotonic", return_value=later):
+            self.assertIsNone(learned_route("chat", self.GREETING, True, False))
+
+        for _ in range(2):
+            remember_route("chat", self.GREETING, True, False, "Onboarding Agent")
+        with mock.patch.object(routing, "ROUTE_CACHE_VERSION", routing.ROUTE_CACHE_VERSION + 1):
+            self.assertIsNone(learned_route("chat", self.GREETING, True, False))
+        self.assertEqual(learned_route("chat", self.GREETING, True, False), "Onboarding Agent")
+        forget_route("chat", self.GREETING, True, False)
+        self.assertIsNone(learned_route("chat", self.GREETING, True, False))
+
+
+class TestBatchTriage(unittest.IsolatedAsyncioTestCase):
+    async def test_batches_and_orders_decisions(self):
+        prompts = []
+
+        async def fake_run(agent, prompt):
+            prompts.append(prompt)
+            # The model answers out of order and skips the last message of each batch.
+            count = prompt.count("\n") + 1
+            decisions = [RouteDecision(id=n, route="scheduling") for n in range(count - 1, 0, -1)]
+            return SimpleNamespace(final_output_as=lambda _type: BatchRouteOutput(decisions=decisions))
+
+        with mock.patch.object(routing.Runner, "run", side_effect=fake_run):
+            decisions = await batch_triage([f"message {n}" for n in range(5)], batch_size=3)
+
+        self.assertEqual(len(prompts), 2)
+        self.assertTrue(prompts[0].startswith("1. message 0\n2. message 1"))
+        self.assertEqual([d.id for d in decisions], [1, 2, 3, 4, 5])
+        self.assertEqual([d.route for d in decisions], ["scheduling", "scheduling", "triage", "scheduling", "triage"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,15 @@
 from __future__ import annotations as _annotations
 
 import json
+import logging
+from functools import lru_cache
 from pathlib import Path
 from typing import Literal, Optional
 
 from agents import function_tool
 
+logger = logging.getLogger(__name__)
+
 # Type definitions
 BrokerId = Literal["bybit", "vantage", "pu_prime"]
 Purpose = Literal["registration", "copy_trade_start", "copy_trade_open_account", "copy_trade_connect"]
@@ -89,16 +93,20 @@ BROKER_LINKS: dict[BrokerId, dict[Purpose, list[AssetItem]]] = {
 }
 
 
+# Accepted spellings (lowercased, stripped) -> canonical broker id
+_BROKER_ALIASES: dict[str, BrokerId] = {
+    "bybit": "bybit",
+    "vantage": "vantage",
+    "pu prime": "pu_prime",
+    "pu_prime": "pu_prime",
+    "puprime": "pu_prime",
+    "pu-prime": "pu_prime",
+}
+
+
 def normalize_broker(broker_raw: str) -> Optional[BrokerId]:
     """Normalize broker name to canonical form."""
-    b = broker_raw.strip().lower()
-    if b == "bybit":
-        return "bybit"
-    if b == "vantage":
-        return "vantage"
-    if b in ("pu prime", "pu_prime", "puprime", "pu-prime"):
-        return "pu_prime"
-    return None
+    return _BROKER_ALIASES.get(broker_raw.strip().lower())
 
 
 def normalize_country(country: str) -> Literal["AUSTRALIA", "CANADA", "OTHER"]:
@@ -151,22 +159,36 @@ def _load_country_offers_data() -> dict[str, dict[str, any]]:
     try:
         with open(json_file, "r", encoding="utf-8") as f:
             _COUNTRY_OFFERS_DATA = json.load(f)
-        print(f"      [INFO] Loaded country offers data from {json_file}")
+        logger.debug("Loaded country offers data from %s", json_file)
         return _COUNTRY_OFFERS_DATA
     except FileNotFoundError:
-        print(f"      [ERROR] Country offers file not found: {json_file}")
+        logger.error("Country offers file not found: %s", json_file)
         _COUNTRY_OFFERS_DATA = {}
         return _COUNTRY_OFFERS_DATA
     except json.JSONDecodeError as e:
-        print(f"      [ERROR] Invalid JSON in country offers file: {e}")
+        logger.error("Invalid JSON in country offers file: %s", e)
         _COUNTRY_OFFERS_DATA = {}
         return _COUNTRY_OFFERS_DATA
     except Exception as e:
-        print(f"      [ERROR] Error loading country offers data: {e}")
+        logger.exception("Error loading country offers data")
         _COUNTRY_OFFERS_DATA = {}
         return _COUNTRY_OFFERS_DATA
 
 
+def country_offers_for(country: str) -> dict[str, any] | None:
+    """
+    Return the raw offers entry (bots, brokers, notes) for a country's group, or None if unavailable.
+
+    Same lookup as the `get_country_offers` tool, for callers that want the data without a tool call.
+    """
+    if not country or not country.strip():
+        return None
+    offers = _load_country_offers_data().get(normalize_country(country))
+    if not isinstance(offers, dict) or not all(key in offers for key in ("bots", "brokers", "notes")):
+        return None
+    return offers
+
+
 def pick_copy_trade_link_by_market(links: list[AssetItem], market: Optional[str] = None) -> list[AssetItem]:
     """Pick the best matching copy-trade link based on market preference."""
     if not market or not links:
@@ -184,42 +206,13 @@ def pick_copy_trade_link_by_market(links: list[AssetItem], market: Optional[str]
     return links[:1] if links else []
 
 
-@function_tool(
-    name_override="get_broker_assets",
-    description_override="Return broker referral/registration links and optional tutorial videos for a given broker and onboarding purpose. Always returns links (primary) and videos (optional helpers) together."
-)
-async def get_broker_assets(
+def broker_assets(
     broker: str,
     purpose: str,
     asset_type: Optional[str] = None,
     market: Optional[str] = None,
-) -> str:
-    """
-    Get broker assets (links and videos) for a given broker and purpose.
-    Links are the primary assets (referral/registration URLs) that users need.
-    Videos are optional helper explainers that accompany the links when available.
-    
-    Args:
-        broker: Broker name (Bybit, Vantage, PU Prime) - case-insensitive
-        purpose: Which onboarding step - "registration", "copy_trade_start", 
-                "copy_trade_open_account", "copy_trade_connect"
-        asset_type: Type of assets requested - "all" (default, returns links + videos), 
-                   "links" (links only), or "videos" (videos only)
-        market: Optional market type for copy_trade_connect links - "crypto", "gold", "silver", "forex"
-               Used to pick the best matching copy trade link when multiple options exist
-    
-    Returns:
-        JSON string with structure:
-        {
-            "ok": true/false,
-            "broker": "normalized_broker_name",
-            "purpose": "purpose_value",
-            "links": [{"title": "...", "url": "..."}, ...],  // Primary: referral/registration URLs
-            "videos": [{"title": "...", "url": "..."}, ...],  // Optional: explainer videos
-            "error": null or error message
-        }
-    """
-    print(f"   [TOOL EXEC] get_broker_assets(broker='{broker}', purpose='{purpose}', asset_type='{asset_type}', market='{market}')")
+) -> dict[str, any]:
+    """Look up links and videos for one broker/purpose; shared by the single and batch tools."""
     
     # Normalize broker name
     broker_id = normalize_broker(broker)
@@ -232,8 +225,8 @@ async def get_broker_assets(
             "videos": [],
             "error": "UNSUPPORTED_BROKER"
         }
-        print(f"      [ERROR] Unsupported broker: {broker}")
-        return json.dumps(result)
+        logger.warning("Unsupported broker: %s", broker)
+        return result
     
     # Validate purpose
     valid_purposes: set[str] = {"registration", "copy_trade_start", "copy_trade_open_account", "copy_trade_connect"}
@@ -247,8 +240,8 @@ async def get_broker_assets(
             "videos": [],
             "error": "UNSUPPORTED_PURPOSE"
         }
-        print(f"      [ERROR] Unsupported purpose: {purpose}")
-        return json.dumps(result)
+        logger.warning("Unsupported purpose: %s", purpose)
+        return result
     
     # Cast to Purpose type for type checking
     purpose_typed: Purpose = purpose_lower  # type: ignore
@@ -267,8 +260,8 @@ async def get_broker_assets(
             "videos": [],
             "error": "UNSUPPORTED_ASSET_TYPE"
         }
-        print(f"      [ERROR] Unsupported asset_type: {asset_type_str}")
-        return json.dumps(result)
+        logger.warning("Unsupported asset_type: %s", asset_type_str)
+        return result
     
     # Get links for the given purpose
     links: list[AssetItem] = []
@@ -297,7 +290,86 @@ async def get_broker_assets(
         "error": None
     }
     
-    print(f"      [SUCCESS] Returning {len(links)} link(s) and {len(videos)} video(s) for {broker_id} (purpose={purpose_typed}, asset_type={asset_type_str})")
+    logger.debug(
+        "Returning %d link(s) and %d video(s) for %s (purpose=%s, asset_type=%s)",
+        len(links), len(videos), broker_id, purpose_typed, asset_type_str,
+    )
+    return result
+
+
+@function_tool(
+    name_override="get_broker_assets",
+    description_override="Return broker referral/registration links and optional tutorial videos for a given broker and onboarding purpose. Always returns links (primary) and videos (optional helpers) together."
+)
+async def get_broker_assets(
+    broker: str,
+    purpose: str,
+    asset_type: Optional[str] = None,
+    market: Optional[str] = None,
+) -> str:
+    """
+    Get broker assets (links and videos) for a given broker and purpose.
+    Links are the primary assets (referral/registration URLs) that users need.
+    Videos are optional helper explainers that accompany the links when available.
+    
+    Args:
+        broker: Broker name (Bybit, Vantage, PU Prime) - case-insensitive
+        purpose: Which onboarding step - "registration", "copy_trade_start", 
+                "copy_trade_open_account", "copy_trade_connect"
+        asset_type: Type of assets requested - "all" (default, returns links + videos), 
+                   "links" (links only), or "videos" (videos only)
+        market: Optional market type for copy_trade_connect links - "crypto", "gold", "silver", "forex"
+               Used to pick the best matching copy trade link when multiple options exist
+    
+    Returns:
+        JSON string with structure:
+        {
+            "ok": true/false,
+            "broker": "normalized_broker_name",
+            "purpose": "purpose_value",
+            "links": [{"title": "...", "url": "..."}, ...],  // Primary: referral/registration URLs
+            "videos": [{"title": "...", "url": "..."}, ...],  // Optional: explainer videos
+            "error": null or error message
+        }
+    """
+    logger.debug(
+        "get_broker_assets(broker=%r, purpose=%r, asset_type=%r, market=%r)", broker, purpose, asset_type, market
+    )
+    return json.dumps(broker_assets(broker, purpose, asset_type, market))
+
+
+@function_tool(
+    name_override="get_broker_assets_batch",
+    description_override="Return links and videos for several onboarding purposes of one broker in a single call. Prefer this over repeated get_broker_assets calls for the same broker."
+)
+async def get_broker_assets_batch(
+    broker: str,
+    purposes: list[str],
+    market: Optional[str] = None,
+) -> str:
+    """
+    Get broker assets for several purposes of the same broker at once.
+
+    Args:
+        broker: Broker name (Bybit, Vantage, PU Prime) - case-insensitive
+        purposes: Onboarding steps to fetch, e.g. ["registration", "copy_trade_open_account", "copy_trade_connect"]
+        market: Optional market type for copy_trade_connect links - "crypto", "gold", "silver", "forex"
+
+    Returns:
+        JSON string with structure:
+        {
+            "ok": true/false,  // true only if every purpose succeeded
+            "broker": "normalized_broker_name",
+            "assets": [<get_broker_assets result for each purpose, in order>]
+        }
+    """
+    logger.debug("get_broker_assets_batch(broker=%r, purposes=%r, market=%r)", broker, purposes, market)
+    assets = [broker_assets(broker, purpose, market=market) for purpose in purposes]
+    result = {
+        "ok": bool(assets) and all(item["ok"] for item in assets),
+        "broker": normalize_broker(broker) or broker,
+        "assets": assets,
+    }
     return json.dumps(result)
 
 
@@ -327,7 +399,7 @@ async def get_country_offers(country: str) -> str:
             "error": null or error message
         }
     """
-    print(f"   [TOOL EXEC] get_country_offers(country='{country}')")
+    logger.debug("get_country_offers(country=%r)", country)
     
     # Validate input
     if not country or not country.strip():
@@ -339,13 +411,18 @@ async def get_country_offers(country: str) -> str:
             "notes": [],
             "error": "MISSING_COUNTRY"
         }
-        print(f"      [ERROR] Country parameter is missing or empty")
+        logger.warning("get_country_offers called without a country")
         return json.dumps(result)
     
     # Normalize country
     normalized_group = normalize_country(country)
-    print(f"      [INFO] Input country: '{country}' -> Normalized group: '{normalized_group}'")
-    
+    logger.debug("Input country %r -> normalized group %r", country, normalized_group)
+    return _country_offers_json(normalized_group)
+
+
+@lru_cache(maxsize=None)
+def _country_offers_json(normalized_group: str) -> str:
+    """Validated get_country_offers response for one country group, serialized once per process."""
     # Load country offers data
     country_data = _load_country_offers_data()
     
@@ -359,7 +436,7 @@ async def get_country_offers(country: str) -> str:
             "notes": [],
             "error": "COUNTRY_GROUP_NOT_FOUND"
         }
-        print(f"      [ERROR] Country group '{normalized_group}' not found in data")
+        logger.error("Country group %r not found in data", normalized_group)
         return json.dumps(result)
     
     offers = country_data[normalized_group]
@@ -381,7 +458,7 @@ async def get_country_offers(country: str) -> str:
             "notes": [],
             "error": f"INVALID_DATA_SCHEMA: Missing keys: {', '.join(missing_keys)}"
         }
-        print(f"      [ERROR] Invalid data schema - missing keys: {missing_keys}")
+        logger.error("Invalid country offers schema - missing keys: %s", missing_keys)
         return json.dumps(result)
     
     # Validate brokers structure
@@ -394,7 +471,7 @@ async def get_country_offers(country: str) -> str:
             "notes": [],
             "error": "INVALID_DATA_SCHEMA: brokers must be a list"
         }
-        print(f"      [ERROR] Invalid brokers structure - must be a list")
+        logger.error("Invalid brokers structure - must be a list")
         return json.dumps(result)
     
     # Validate each broker has required fields
@@ -408,7 +485,7 @@ async def get_country_offers(country: str) -> str:
                 "notes": [],
                 "error": "INVALID_DATA_SCHEMA: broker items must be objects"
             }
-            print(f"      [ERROR] Invalid broker structure - must be objects")
+            logger.error("Invalid broker structure - must be objects")
             return json.dumps(result)
         if "name" not in broker:
             result = {
@@ -419,7 +496,7 @@ async def get_country_offers(country: str) -> str:
                 "notes": [],
                 "error": "INVALID_DATA_SCHEMA: broker missing 'name' field"
             }
-            print(f"      [ERROR] Invalid broker structure - missing 'name' field")
+            logger.error("Invalid broker structure - missing 'name' field")
             return json.dumps(result)
     
     # Build result
@@ -432,10 +509,9 @@ async def get_country_offers(country: str) -> str:
         "error": None
     }
     
-    print(f"      [SUCCESS] Returning {len(bots)} bot(s) and {len(brokers)} broker(s) for {normalized_group}")
-    print(f"      [INFO] Bots: {', '.join(bots) if bots else 'none'}")
-    print(f"      [INFO] Brokers: {', '.join(b.get('name', 'Unknown') for b in brokers) if brokers else 'none'}")
-    if notes:
-        print(f"      [INFO] Notes: {len(notes)} note(s)")
+    logger.debug(
+        "Returning %d bot(s), %d broker(s) and %d note(s) for %s",
+        len(bots), len(brokers), len(notes or ()), normalized_group,
+    )
     
     return json.dumps(result)
@@ -9,6 +9,7 @@ from dotenv import load_dotenv
 from chatkit.server import StreamingResult
 
 load_dotenv()
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
 from fastapi import Depends, FastAPI, Query, Request
 from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
@@ -19,6 +19,8 @@ from agents import (
     InputGuardrailTripwireTriggered,
     ItemHelpers,
     MessageOutputItem,
+    RunConfig,
+    RunContextWrapper,
     Runner,
     ToolCallItem,
     ToolCallOutputItem,
@@ -40,7 +42,13 @@ from chatkit.types import (
 )
 from chatkit.store import NotFoundError
 
-from airline.context import AirlineAgentChatContext, AirlineAgentContext, create_initial_context, public_context
+from airline.context import (
+    AirlineAgentChatContext,
+    AirlineAgentContext,
+    OnboardingSnapshot,
+    create_initial_context,
+    public_context,
+)
 from airline.context_cache import (
     get_lead_info_cache,
     set_lead_info,
@@ -48,8 +56,15 @@ from airline.context_cache import (
     get_onboarding_state_cache,
     set_onboarding_state,
     restore_onboarding_state_to_context,
+    restore_thread_context,
 )
+from airline.faq_cache import get_cached_faq_answer, looks_like_question, set_cached_faq_answer
+from airline.guardrails import input_passes_screening
+from lucentive.tools import normalize_country
+from airline.history import trim_model_input
+from airline.routing import SHORT_CIRCUIT_CONFIDENCE, classify_intent, forget_route, learned_route, remember_route
 from airline.agents import (
+    AGENTS_BY_NAME,
     investments_faq_agent,
     onboarding_agent,
     scheduling_agent,
@@ -72,6 +87,66 @@ class _PlainTextUserMessage:
     def __init__(self, text: str):
         self.content = [_PlainTextPart(text)]
 
+# Agents whose turn may be short-circuited by a cached FAQ answer (never mid-scheduling).
+_FAQ_CACHE_AGENT_NAMES = frozenset({
+    triage_agent.name,
+    onboarding_agent.name,
+    investments_faq_agent.name,
+})
+
+
+def _faq_answer_from_run(run_items: List[Any]) -> str | None:
+    """Return the FAQ agent's final answer if it was grounded in a file_search call during this run."""
+    searched = False
+    answer: str | None = None
+    for item in run_items:
+        if getattr(item, "agent", None) is not investments_faq_agent:
+            continue
+        if isinstance(item, ToolCallItem) and getattr(item.raw_item, "type", None) == "file_search_call":
+            searched = True
+        elif isinstance(item, MessageOutputItem) and searched:
+            answer = ItemHelpers.text_message_output(item)
+    if not answer:
+        return None
+    return _strip_user_visible_citations(answer) or None
+
+
+def _triage_route_from_run(run_items: List[Any]) -> str:
+    """Name of the agent triage handed off to during this run, or triage itself if it answered."""
+    for item in run_items:
+        if isinstance(item, HandoffOutputItem) and item.source_agent is triage_agent:
+            return item.target_agent.name
+    return triage_agent.name
+
+
+def _handed_off_before_replying(run_items: List[Any], agent: Any) -> bool:
+    """True if `agent` handed the turn to another agent before sending a message of its own."""
+    for item in run_items:
+        if isinstance(item, MessageOutputItem) and item.agent is agent:
+            return False
+        if isinstance(item, HandoffOutputItem) and item.source_agent is agent:
+            return True
+    return False
+
+
+def _ends_with_user_message(items: List[Any]) -> bool:
+    """True if the last input item is a user message still waiting for a reply."""
+    return bool(items) and isinstance(items[-1], dict) and items[-1].get("role") == "user"
+
+
+def _previous_assistant_text(items: List[Any]) -> str | None:
+    """Text of the most recent assistant message in a Responses-style input list."""
+    for item in reversed(items):
+        if not isinstance(item, dict) or item.get("role") != "assistant":
+            continue
+        content = item.get("content")
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return None
+    return None
+
 _CITATION_PATTERNS: list[re.Pattern[str]] = [
     # OpenAI file_search citation format, e.g. "…"
     re.compile(r"【[^】]*†source】"),
@@ -189,13 +264,18 @@ class GuardrailCheck(BaseModel):
 
 def _get_agent_by_name(name: str):
     """Return the agent object by name."""
-    agents = {
-        triage_agent.name: triage_agent,
-        investments_faq_agent.name: investments_faq_agent,
-        scheduling_agent.name: scheduling_agent,
-        onboarding_agent.name: onboarding_agent,
-    }
-    return agents.get(name, triage_agent)
+    return AGENTS_BY_NAME.get(name, triage_agent)
+
+
+# Full history stays in ThreadState.input_items; only the model request is trimmed.
+_RUN_CONFIG = RunConfig(call_model_input_filter=trim_model_input)
+
+# Specialist agents a classified intent may route to directly.
+_INTENT_AGENTS = {
+    "investments_faq": investments_faq_agent,
+    "scheduling": scheduling_agent,
+    "onboarding": onboarding_agent,
+}
 
 
 def _get_guardrail_name(g) -> str:
@@ -374,11 +454,11 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
                     }
                     self._lead_info_cache[thread.id] = lead_info_dict
                     set_lead_info(thread.id, lead_info_dict)  # Also update module-level cache
-                    print(f"[DEBUG] Updated lead info for thread {thread.id}: first_name={state.context.first_name}, country={state.context.country}, new_lead={state.context.new_lead}")
+                    logger.debug("Updated lead info for thread %s: first_name=%s, country=%s, new_lead=%s", thread.id, state.context.first_name, state.context.country, state.context.new_lead)
                 else:
                     # Even if no lead_info in context, restore from cache if available
                     restore_lead_info_to_context(thread.id, state.context)
-                    print(f"[DEBUG] Loaded existing thread {thread.id} - restored from cache: first_name={state.context.first_name}, country={state.context.country}, new_lead={state.context.new_lead}")
+                    logger.debug("Loaded existing thread %s - restored from cache: first_name=%s, country=%s, new_lead=%s", thread.id, state.context.first_name, state.context.country, state.context.new_lead)
                 return thread
             except NotFoundError:
                 pass
@@ -408,7 +488,7 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
             }
             self._lead_info_cache[new_thread.id] = lead_info_dict
             set_lead_info(new_thread.id, lead_info_dict)  # Also update module-level cache
-            print(f"[DEBUG] Set lead info for new thread {new_thread.id}: first_name={state.context.first_name}, country={state.context.country}, new_lead={state.context.new_lead}")
+            logger.debug("Set lead info for new thread %s: first_name=%s, country=%s, new_lead=%s", new_thread.id, state.context.first_name, state.context.country, state.context.new_lead)
         return new_thread
 
     async def ensure_thread(self, thread_id: Optional[str], context: dict[str, Any]) -> ThreadMetadata:
@@ -679,7 +759,7 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
                     state.context.country = cached_lead_info["country"]
                 if cached_lead_info.get("new_lead") is not None and state.context.new_lead is False:
                     state.context.new_lead = cached_lead_info["new_lead"]
-                print(f"[DEBUG] Restored lead info from cache for thread {thread.id}: first_name={state.context.first_name}, country={state.context.country}, new_lead={state.context.new_lead}")
+                logger.debug("Restored lead info from cache for thread %s: first_name=%s, country=%s, new_lead=%s", thread.id, state.context.first_name, state.context.country, state.context.new_lead)
             
             # FALLBACK: If this thread still has no valid lead info, try to copy from most recent cache entry with valid data
             # This handles the case where ChatKit creates a new thread or cached thread has null values
@@ -697,7 +777,7 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
                         # Cache for this thread too so it persists
                         self._lead_info_cache[thread.id] = cached_lead_info.copy()
                         set_lead_info(thread.id, cached_lead_info.copy())
-                        print(f"[DEBUG] Copied valid lead info from thread {cached_thread_id} to thread {thread.id}: first_name={state.context.first_name}, country={state.context.country}")
+                        logger.debug("Copied valid lead info from thread %s to thread %s: first_name=%s, country=%s", cached_thread_id, thread.id, state.context.first_name, state.context.country)
                         break
                 # Fallback to preserved values if cache doesn't exist
                 if preserved_first_name and not state.context.first_name:
@@ -711,7 +791,7 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
                 if preserved_new_lead is True and state.context.new_lead is False:
                     state.context.new_lead = True
         
-        print(f"[DEBUG] Before Runner - Context state: first_name={state.context.first_name}, country={state.context.country}, new_lead={state.context.new_lead}")
+        logger.debug("Before Runner - Context state: first_name=%s, country=%s, new_lead=%s", state.context.first_name, state.context.country, state.context.new_lead)
         
         user_text = ""
         if input_user_message is not None:
@@ -742,8 +822,7 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
 
         # CRITICAL: Restore context from cache BEFORE creating chat_context
         # This ensures context is populated even if it was reset
-        restore_lead_info_to_context(thread.id, state.context)
-        restore_onboarding_state_to_context(thread.id, state.context)
+        restore_thread_context(thread.id, state.context)
         
         # FALLBACK: If this thread still has no valid lead info, try to copy from most recent cache entry with valid data
         if (not state.context.first_name and not state.context.country and 
@@ -760,7 +839,7 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
                     # Cache for this thread too so it persists
                     self._lead_info_cache[thread.id] = cached_lead_info.copy()
                     set_lead_info(thread.id, cached_lead_info.copy())
-                    print(f"[DEBUG] Before Runner - Copied valid lead info from thread {cached_thread_id} to thread {thread.id}: first_name={state.context.first_name}, country={state.context.country}")
+                    logger.debug("Before Runner - Copied valid lead info from thread %s to thread %s: first_name=%s, country=%s", cached_thread_id, thread.id, state.context.first_name, state.context.country)
                     break
         
         previous_context = public_context(state.context)
@@ -776,13 +855,128 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
         # The lead info should already be in state.context from lines 424-480 above
         streamed_items_seen = 0
 
+        # With no new user message (e.g. an action re-entering the thread), triage would only run a
+        # model turn to decide not to route again; skip the runner instead.
+        if (
+            input_user_message is None
+            and _get_agent_by_name(state.current_agent_name) is triage_agent
+            and not _ends_with_user_message(state.input_items)
+        ):
+            logger.info("No new user message for triage; skipping run", extra={"thread_id": thread.id})
+            await self._broadcast_state(thread, context)
+            return
+
         # Tell the client which thread to bind runner updates to before streaming starts.
         yield ClientEffectEvent(name="runner_bind_thread", data={"thread_id": thread.id, "ts": time.time()})
 
+        # Repeated knowledge-base questions are answered from the FAQ cache without a model round trip.
+        # Only questions qualify: a statement (e.g. an onboarding answer) always goes to the agent.
+        cached_answer = (
+            get_cached_faq_answer(user_text, normalize_country(state.context.country or ""))
+            if user_text
+            and state.current_agent_name in _FAQ_CACHE_AGENT_NAMES
+            and looks_like_question(user_text)
+            else None
+        )
+        if cached_answer is not None:
+            # A cached answer still goes through the input screen; a flagged message takes the normal
+            # run, where the guardrail trips on the same (cached) verdict.
+            try:
+                passed = await input_passes_screening(RunContextWrapper(chat_context), state.input_items)
+            except Exception:
+                logger.exception("Input screening failed; skipping FAQ cache", extra={"thread_id": thread.id})
+                passed = False
+            if not passed:
+                cached_answer = None
+        if cached_answer is not None:
+            logger.info(
+                "FAQ cache hit",
+                extra={"thread_id": thread.id, "agent": state.current_agent_name},
+            )
+            if state.current_agent_name != investments_faq_agent.name:
+                # The answer stands in for a handoff to the FAQ agent; record it like the run would.
+                state.events.append(
+                    AgentEvent(
+                        id=uuid4().hex,
+                        type="handoff",
+                        agent=state.current_agent_name,
+                        content=f"{state.current_agent_name} -> {investments_faq_agent.name}",
+                        metadata={
+                            "source_agent": state.current_agent_name,
+                            "target_agent": investments_faq_agent.name,
+                            "routing": "faq_cache",
+                        },
+                        timestamp=time.time() * 1000,
+                    )
+                )
+                state.current_agent_name = investments_faq_agent.name
+            state.input_items.append({"role": "assistant", "content": cached_answer})
+            state.events.append(
+                AgentEvent(
+                    id=uuid4().hex,
+                    type="message",
+                    agent=investments_faq_agent.name,
+                    content=self._truncate(cached_answer),
+                    metadata={"source": "faq_cache"},
+                    timestamp=time.time() * 1000,
+                )
+            )
+            yield ThreadItemDoneEvent(
+                item=AssistantMessageItem(
+                    id=self.store.generate_item_id("message", thread, context),
+                    thread_id=thread.id,
+                    created_at=datetime.now(),
+                    content=[AssistantMessageContent(text=cached_answer)],
+                )
+            )
+            await self._broadcast_state(thread, context)
+            return
+
         result = None
+        # (message, previous reply, new_lead, onboarding_complete) when triage runs a full turn or a
+        # learned route is replayed.
+        route_situation = None
+        # The agent a learned route sent this turn to; its outcome is checked after the run.
+        replayed_agent = None
         started_at = time.time()
         try:
             current_agent = _get_agent_by_name(state.current_agent_name)
+            if current_agent is triage_agent and user_text:
+                # Unambiguous chat/FAQ/call requests start at the specialist, skipping one triage model turn.
+                new_lead = state.context.new_lead
+                onboarding_complete = bool(OnboardingSnapshot.from_state(state.context.onboarding_state).onboarding_complete)
+                prediction = classify_intent(user_text, new_lead=new_lead, onboarding_complete=onboarding_complete)
+                target_agent = _INTENT_AGENTS.get(prediction.intent)
+                routing = {"routing": "intent_classifier", "confidence": prediction.confidence}
+                if target_agent is None or prediction.confidence < SHORT_CIRCUIT_CONFIDENCE:
+                    # Otherwise replay the handoff triage consistently made for the same situation.
+                    route_situation = (
+                        user_text,
+                        _previous_assistant_text(state.input_items[:-1]),
+                        new_lead,
+                        onboarding_complete,
+                    )
+                    target_agent = AGENTS_BY_NAME.get(learned_route(*route_situation) or "")
+                    routing = {"routing": "learned_route"}
+                if target_agent is not None and target_agent is not triage_agent:
+                    state.events.append(
+                        AgentEvent(
+                            id=uuid4().hex,
+                            type="handoff",
+                            agent=triage_agent.name,
+                            content=f"{triage_agent.name} -> {target_agent.name}",
+                            metadata={
+                                "source_agent": triage_agent.name,
+                                "target_agent": target_agent.name,
+                                **routing,
+                            },
+                            timestamp=time.time() * 1000,
+                        )
+                    )
+                    current_agent = target_agent
+                    state.current_agent_name = target_agent.name
+                    if route_situation is not None:
+                        replayed_agent = target_agent
             logger.info(
                 "Runner starting",
                 extra={
@@ -808,6 +1002,7 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
                 current_agent,
                 state.input_items,
                 context=chat_context,
+                run_config=_RUN_CONFIG,
             )
             async for event in stream_agent_response(chat_context, result):
                 if isinstance(event, ProgressUpdateEvent) or getattr(event, "type", "") == "progress_update_event":
@@ -974,6 +1169,18 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
                 content = last_item.get("content") or ""
                 if isinstance(content, str) and _contains_phone_timezone_request(content):
                     state.input_items[-1] = {**last_item, "content": _SCHEDULING_CONFIRMATION_REPLACEMENT}
+        if route_situation is not None:
+            if replayed_agent is None:
+                remember_route(*route_situation, _triage_route_from_run(result.new_items))
+            elif _handed_off_before_replying(result.new_items, replayed_agent):
+                # The replayed agent passed the message straight on: the learned route was wrong.
+                forget_route(*route_situation)
+        faq_answer = _faq_answer_from_run(result.new_items)
+        first_name = state.context.first_name
+        # Answers that address the lead by name are personal and are not shared with other threads;
+        # the rest are shared only with leads in the same country group.
+        if faq_answer and user_text and not (first_name and first_name.lower() in faq_answer.lower()):
+            set_cached_faq_answer(user_text, faq_answer, normalize_country(state.context.country or ""))
         remaining_items = result.new_items[streamed_items_seen:]
         new_events, active_agent = self._record_events(remaining_items, state.current_agent_name, thread.id)
         state.events.extend(new_events)
@@ -995,7 +1202,7 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
         # is updated with any changes from chat_context.state
         if chat_context.state is not state.context:
             # If they're different objects (shouldn't happen, but be safe), sync the state
-            print(f"[WARNING] chat_context.state is not the same object as state.context - syncing...")
+            logger.warning("chat_context.state is not the same object as state.context - syncing...")
             # Copy all fields from chat_context.state to state.context
             for field_name in state.context.model_fields.keys():
                 if hasattr(chat_context.state, field_name):
@@ -1048,7 +1255,7 @@ class AirlineServer(ChatKitServer[dict[str, Any]]):
             set_onboarding_state(thread.id, state.context.onboarding_state.copy())
         
         # Debug: Print context state to verify it's preserved
-        print(f"[DEBUG] After Runner - Context state: first_name={state.context.first_name}, country={state.context.country}, new_lead={state.context.new_lead}, email={state.context.email}, onboarding_state={state.context.onboarding_state}")
+        logger.debug("After Runner - Context state: first_name=%s, country=%s, new_lead=%s, email=%s, onboarding_state=%s", state.context.first_name, state.context.country, state.context.new_lead, state.context.email, state.context.onboarding_state)
 
         new_context = public_context(state.context)
         changes = {k: new_context[k] for k in new_context if previous_context.get(k) != new_context[k]}